@@ -1,12 +1,14 @@
 from django.contrib import admin
+from django.forms.models import BaseInlineFormSet
 
 from lti_tool.forms import KeyForm
-from lti_tool.models import Key, Platform, Resource
+from lti_tool.models import Context, Key, LTIUser, Platform, Resource, Roles
 
 
 @admin.register(Platform)
 class PlatformAdmin(admin.ModelAdmin):
     list_display = ("issuer", "deployment_id", "key")
+    list_select_related = ("key",)
 
 
 @admin.register(Key)
@@ -15,8 +17,72 @@ class KeyAdmin(admin.ModelAdmin):
     list_display = ("kid",)
 
 
+class LaunchDataAdmin(admin.ModelAdmin):
+    """Admin of rows created by launches.
+
+    Tables grow with every launch. Lists skip counting all rows and related
+    objects are shown as IDs.
+    """
+
+    list_per_page = 50
+    show_full_result_count = False
+
+    def has_add_permission(self, request):
+        return False
+
+
+@admin.register(Context)
+class ContextAdmin(LaunchDataAdmin):
+    list_display = ("title", "label", "context_id", "platform")
+    list_filter = ("platform",)
+    list_select_related = ("platform",)
+    search_fields = ("=context_id", "^title", "^label")
+    readonly_fields = ("context_id", "platform", "title", "label", "context_type")
+
+
+@admin.register(Resource)
+class ResourceAdmin(LaunchDataAdmin):
+    list_display = ("title", "resource_id", "context", "platform")
+    list_filter = ("platform",)
+    list_select_related = ("context", "platform")
+    search_fields = ("=resource_id", "^title")
+    raw_id_fields = ("resource_link",)
+    readonly_fields = ("resource_id", "platform", "context", "title", "lineitem_id")
+
+
+@admin.register(LTIUser)
+class LTIUserAdmin(LaunchDataAdmin):
+    list_display = ("user", "identifier", "platform")
+    list_filter = ("platform",)
+    list_select_related = ("user", "platform")
+    search_fields = ("=identifier", "^user__username", "^user__email")
+    raw_id_fields = ("user", "platform")
+    readonly_fields = ("identifier",)
+
+
+@admin.register(Roles)
+class RolesAdmin(LaunchDataAdmin):
+    list_display = ("lti_user", "context", "roles")
+    list_select_related = ("lti_user__user", "context")
+    search_fields = ("=lti_user__identifier", "=context__context_id")
+    raw_id_fields = ("lti_user", "context")
+    readonly_fields = ("roles",)
+
+
+class ResourceUsageFormSet(BaseInlineFormSet):
+    # Resources may be used in many contexts. Show the latest ones only.
+    max_shown = 20
+
+    def get_queryset(self):
+        if not hasattr(self, "_shown"):
+            queryset = super().get_queryset().select_related("context", "platform")
+            self._shown = queryset.order_by("-pk")[: self.max_shown]
+        return self._shown
+
+
 class ResourceInline(admin.TabularInline):
     model = Resource
+    formset = ResourceUsageFormSet
     verbose_name = "LTI Resource Usage"
     max_num = 0  # Disables 'Add another *' button
     readonly_fields = ["title", "description"]
@@ -32,9 +98,21 @@ class ResourceInline(admin.TabularInline):
 
 
 class ResourceLinkAdmin(admin.ModelAdmin):
+    @admin.display(description="Usages")
+    def usage_count(self, obj):
+        # Counted per object, annotating the queryset would group all
+        # resources on every changelist page
+        return Resource.objects.filter(resource_link_id=obj.pk).count()
+
+    def get_readonly_fields(self, request, obj=None):
+        readonly_fields = super().get_readonly_fields(request, obj)
+        return [*readonly_fields, "usage_count"]
+
     def get_fields(self, request, obj=None):
         fields = super().get_fields(request, obj)
         fields.remove("title")
+        if "usage_count" in fields:
+            fields.remove("usage_count")
         return fields
 
     def get_fieldsets(self, request, obj=None):
@@ -42,7 +120,7 @@ class ResourceLinkAdmin(admin.ModelAdmin):
         fieldsets.append(
             (
                 "LTI Resource Link Information",
-                {"classes": ["inline-group"], "fields": ["title"]},
+                {"classes": ["inline-group"], "fields": ["title", "usage_count"]},
             )
         )
         return fieldsets
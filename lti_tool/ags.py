@@ -1,8 +1,19 @@
 from datetime import datetime
+from hashlib import sha1
+from itertools import repeat
+from threading import Thread
+from time import time
 from urllib.parse import urlsplit, urlunsplit
 
+from django.core.cache import cache
+from django.db import connection
 from pytz import utc
 
+from lti_tool.codec import loads
+from lti_tool.exceptions import LTIRequestError
+from lti_tool.httpclient import HTTPClient
+from lti_tool.stats import ResultColumns, summarize
+
 
 def ts2str(ts):
     """Generates LTI conformant date-time string.
@@ -14,6 +25,107 @@ def ts2str(ts):
     return ts.astimezone(utc).isoformat(timespec="milliseconds")
 
 
+def results_cache_key(lineitem_id):
+    return f"lti_ags_results_{sha1(bytes(lineitem_id, 'utf-8')).hexdigest()}"
+
+
+def results_generation_key(lineitem_id):
+    return f"{results_cache_key(lineitem_id)}_generation"
+
+
+def invalidate_results(lineitem_id):
+    """Drops cached results of a lineitem.
+
+    Bumps the generation of the lineitem as well, so results fetched before
+    are not cached by a refresh finishing afterwards.
+
+    :param lineitem_id: ID (url) of the lineitem
+    """
+    generation_key = results_generation_key(lineitem_id)
+    cache.add(generation_key, 0, timeout=None)
+    try:
+        cache.incr(generation_key)
+    except ValueError:
+        # Evicted meanwhile
+        cache.set(generation_key, 1, timeout=None)
+
+    cache.delete(results_cache_key(lineitem_id))
+
+
+def deeplink_lineitem(
+    label="",
+    score_maximum=100,
+    resource_id=None,
+    tag=None,
+    grades_released=None,
+    start_ts=None,
+    end_ts=None,
+):
+    """Generates lineitem properties of a deep linking content item.
+
+    :param start_ts: datetime object, start of submission
+    :param end_ts: datetime object, end of submission
+    :rtype: dictionary to update an 'ltiResourceLink' content item with
+    """
+    lineitem = {"scoreMaximum": score_maximum}
+
+    if label:
+        lineitem["label"] = label
+    if resource_id:
+        lineitem["resourceId"] = resource_id
+    if tag:
+        lineitem["tag"] = tag
+    if grades_released is not None:
+        lineitem["gradesReleased"] = grades_released
+
+    item = {"lineItem": lineitem}
+
+    submission = {}
+    if start_ts:
+        submission["startDateTime"] = ts2str(start_ts)
+    if end_ts:
+        submission["endDateTime"] = ts2str(end_ts)
+    if submission:
+        item["submission"] = submission
+
+    return item
+
+
+ACTIVITY_PROGRESS = (
+    "Initialized",
+    "Started",
+    "InProgress",
+    "Submitted",
+    "Completed",
+)
+
+GRADING_PROGRESS = (
+    "NotReady",
+    "Failed",
+    "PendingManual",
+    "Pending",
+    "FullyGraded",
+)
+
+
+def validate_progress(activity_progress, grading_progress):
+    """Checks activity and grading progress of a score.
+
+    :raises ValueError: if a value is not defined by the specification
+    """
+    if activity_progress not in ACTIVITY_PROGRESS:
+        raise ValueError(
+            f"Argument activity_progress has to be one of "
+            f"{str(list(ACTIVITY_PROGRESS))}"
+        )
+
+    if grading_progress not in GRADING_PROGRESS:
+        raise ValueError(
+            f"Argument grading_progress has to be one of "
+            f"{str(list(GRADING_PROGRESS))}"
+        )
+
+
 class LineItemManager:
     def __init__(self, context, client):
         self.context = context
@@ -40,10 +152,10 @@ class LineItemManager:
         headers = {"Accept": "application/vnd.ims.lis.v2.lineitem+json"}
 
         resp = self._client.get(
-            lineitem_id, context=self.context, headers=headers
-        ).json()
+            lineitem_id, context=self.context, headers=headers, kind="lineitem"
+        )
 
-        return LineItem(self, resp, loaded=True)
+        return LineItem(self, loads(resp.content), loaded=True)
 
     def create(
         self,
@@ -75,17 +187,21 @@ class LineItemManager:
             data["endDateTime"] = ts2str(end_ts)
 
         resp = self._client.post(
-            self.context._lineitems, context=self.context, headers=headers, json=data
-        ).json()
+            self.context._lineitems,
+            context=self.context,
+            headers=headers,
+            json=data,
+            kind="lineitems",
+        )
 
-        return LineItem(self, resp, loaded=True)
+        return LineItem(self, loads(resp.content), loaded=True)
 
     def delete(self, lineitem_id):
         """Deletes a lineitem.
 
         :param lineitem_id: ID (url) of the lineitem
         """
-        self._client.delete(lineitem_id, context=self.context)
+        self._client.delete(lineitem_id, context=self.context, kind="lineitem")
 
     def update(self, lineitem_id, data):
         """Updates a lineitem.
@@ -100,10 +216,14 @@ class LineItemManager:
         headers = {"Content-Type": "application/vnd.ims.lis.v2.lineitem+json"}
 
         resp = self._client.put(
-            lineitem_id, context=self.context, headers=headers, json=data
-        ).json()
+            lineitem_id,
+            context=self.context,
+            headers=headers,
+            json=data,
+            kind="lineitem",
+        )
 
-        return LineItem(self, resp, loaded=True)
+        return LineItem(self, loads(resp.content), loaded=True)
 
     def list(self):
         """Lists lineitems.
@@ -113,27 +233,117 @@ class LineItemManager:
         headers = {"Accept": "application/vnd.ims.lis.v2.lineitemcontainer+json"}
 
         resp = self._client.get(
-            self.context._lineitems, context=self.context, headers=headers
-        ).json()
+            self.context._lineitems,
+            context=self.context,
+            headers=headers,
+            kind="lineitems",
+        )
+
+        return [LineItem(self, i, loaded=True) for i in loads(resp.content)]
+
+    def _fetch_results(self, lineitem_id):
+        headers = {"Accept": "application/vnd.ims.lis.v2.resultcontainer+json"}
+
+        resp = self._client.get(
+            self._build_url(lineitem_id, "/results"),
+            context=self.context,
+            headers=headers,
+            kind="results",
+        )
 
-        return [LineItem(self, i, loaded=True) for i in resp]
+        return loads(resp.content)
 
-    def get_results(self, lineitem_id):
+    def _cache_results(self, lineitem_id, ttl, stale, generation):
+        # Entries carry the generation read before fetching. Entries of an
+        # older generation are ignored, see invalidate_results().
+        results = self._fetch_results(lineitem_id)
+        cache.set(
+            results_cache_key(lineitem_id),
+            (results, time() + ttl, generation),
+            ttl + stale,
+        )
+        return results
+
+    def _revalidate_results(self, lineitem_id, ttl, stale, generation):
+        cache_key = results_cache_key(lineitem_id)
+        try:
+            self._cache_results(lineitem_id, ttl, stale, generation)
+        except LTIRequestError:
+            pass  # Keep serving stale results
+        finally:
+            cache.delete(f"{cache_key}_refresh")
+            connection.close()
+
+    def get_results(self, lineitem_id, ttl=None, stale=0):
         """Gets results of a lineitem.
 
+        Results are cached if a TTL is given. Within further `stale`
+        seconds, cached results are returned while being refreshed in the
+        background. Setting scores through this manager drops them.
+
         :param lineitem_id: ID (url) of the lineitem
+        :param ttl: seconds to cache results for
+        :param stale: seconds to serve expired results while refreshing
         :rtype: list of results in
             'application/vnd.ims.lis.v2.resultcontainer+json' representation
         """
-        headers = {"Accept": "application/vnd.ims.lis.v2.resultcontainer+json"}
+        if not ttl:
+            return self._fetch_results(lineitem_id)
 
-        resp = self._client.get(
-            self._build_url(lineitem_id, "/results"),
-            context=self.context,
-            headers=headers,
-        ).json()
+        cache_key = results_cache_key(lineitem_id)
+        generation_key = results_generation_key(lineitem_id)
 
-        return resp
+        entries = cache.get_many([cache_key, generation_key])
+        generation = entries.get(generation_key, 0)
+        results, expires, cached = entries.get(cache_key, (None, None, None))
+
+        if results is None or cached != generation:
+            return self._cache_results(lineitem_id, ttl, stale, generation)
+
+        # Refresh once per expiry
+        if expires <= time() and cache.add(f"{cache_key}_refresh", True, ttl):
+            # Sessions of HTTP clients are not thread-safe. Access tokens are
+            # shared between clients.
+            refresher = LineItemManager(self.context, HTTPClient())
+            Thread(
+                target=refresher._revalidate_results,
+                args=(lineitem_id, ttl, stale, generation),
+                daemon=True,
+            ).start()
+
+        return results
+
+    def get_statistics(self, lineitem_id, bins=10, ttl=None, stale=0):
+        """Computes statistics of the results of a lineitem.
+
+        :param lineitem_id: ID (url) of the lineitem
+        :param bins: number of histogram bins
+        :param ttl: seconds to cache results for
+        :param stale: seconds to serve expired results while refreshing
+        :rtype: dictionary of aggregates, see :func:`stats.summarize`
+        """
+        results = self.get_results(lineitem_id, ttl=ttl, stale=stale)
+        return summarize(ResultColumns.from_results(results), bins)
+
+    def get_context_statistics(self, bins=10, ttl=None, stale=0):
+        """Computes statistics of the results of all lineitems of the context.
+
+        :param bins: number of histogram bins
+        :param ttl: seconds to cache results for
+        :param stale: seconds to serve expired results while refreshing
+        :rtype: dictionary with aggregates of all results as 'context' and
+            of each lineitem as 'lineitems', keyed by lineitem ID
+        """
+        columns = ResultColumns()
+        lineitems = {}
+
+        for lineitem in self.list():
+            results = self.get_results(lineitem.id, ttl=ttl, stale=stale)
+            lineitem_columns = ResultColumns.from_results(results)
+            lineitems[lineitem.id] = summarize(lineitem_columns, bins)
+            columns.merge(lineitem_columns)
+
+        return {"context": summarize(columns, bins), "lineitems": lineitems}
 
     def get_user_result(self, lineitem_id, user):
         """Gets result of a lineitem for a LTIUser.
@@ -155,12 +365,40 @@ class LineItemManager:
         """
         headers = {"Content-Type": "application/vnd.ims.lis.v1.score+json"}
 
-        self._client.post(
-            self._build_url(lineitem_id, "/scores"),
-            context=self.context,
-            headers=headers,
-            json=score.to_dict(),
-        )
+        try:
+            self._client.post(
+                self._build_url(lineitem_id, "/scores"),
+                context=self.context,
+                headers=headers,
+                json=score.to_dict(),
+                kind="scores",
+            )
+        finally:
+            invalidate_results(lineitem_id)
+
+    def set_scores(self, lineitem_id, scores):
+        """Sets scores of a lineitem.
+
+        AGS accepts a single score per request. Scores are serialized and
+        posted one after another over the same session.
+
+        :param lineitem_id: ID (url) of the lineitem
+        :param scores: :class:`ags.ScoreBatch`
+        """
+        headers = {"Content-Type": "application/vnd.ims.lis.v1.score+json"}
+        url = self._build_url(lineitem_id, "/scores")
+
+        try:
+            for score in scores:
+                self._client.post(
+                    url,
+                    context=self.context,
+                    headers=headers,
+                    json=score,
+                    kind="scores",
+                )
+        finally:
+            invalidate_results(lineitem_id)
 
 
 class LineItem:
@@ -211,13 +449,25 @@ class LineItem:
         if lineitem:
             self._data = lineitem._data
 
-    def get_results(self):
+    def get_results(self, ttl=None, stale=0):
         """Gets results of this lineitem.
 
+        :param ttl: seconds to cache results for
+        :param stale: seconds to serve expired results while refreshing
         :rtype: list of results in
             'application/vnd.ims.lis.v2.resultcontainer+json' representation
         """
-        return self._manager.get_results(self.id)
+        return self._manager.get_results(self.id, ttl=ttl, stale=stale)
+
+    def get_statistics(self, bins=10, ttl=None, stale=0):
+        """Computes statistics of the results of this lineitem.
+
+        :param bins: number of histogram bins
+        :param ttl: seconds to cache results for
+        :param stale: seconds to serve expired results while refreshing
+        :rtype: dictionary of aggregates, see :func:`stats.summarize`
+        """
+        return self._manager.get_statistics(self.id, bins=bins, ttl=ttl, stale=stale)
 
     def get_user_result(self, user):
         """Gets result of this lineitem for a LTIUser.
@@ -235,6 +485,13 @@ class LineItem:
         """
         self._manager.set_score(self.id, score)
 
+    def set_scores(self, scores):
+        """Sets scores of this lineitem.
+
+        :param scores: :class:`ags.ScoreBatch`
+        """
+        self._manager.set_scores(self.id, scores)
+
 
 class Score:
     def __init__(
@@ -257,37 +514,9 @@ class Score:
         else:
             self.timestamp = ts2str(datetime.now())
 
-        valid_activity_progress = [
-            "Initialized",
-            "Started",
-            "InProgress",
-            "Submitted",
-            "Completed",
-        ]
-
-        if activity_progress in valid_activity_progress:
-            self.activity_progress = activity_progress
-        else:
-            raise ValueError(
-                f"Argument activity_progress has to be one of "
-                f"{str(valid_activity_progress)}"
-            )
-
-        valid_grading_progress = [
-            "NotReady",
-            "Failed",
-            "PendingManual",
-            "Pending",
-            "FullyGraded",
-        ]
-
-        if grading_progress in valid_grading_progress:
-            self.grading_progress = grading_progress
-        else:
-            raise ValueError(
-                f"Argument grading_progress has to be one of "
-                f"{str(valid_grading_progress)}"
-            )
+        validate_progress(activity_progress, grading_progress)
+        self.activity_progress = activity_progress
+        self.grading_progress = grading_progress
 
     def __repr__(self):
         return str(self.to_dict())
@@ -308,3 +537,84 @@ class Score:
             score["comment"] = self.comment
 
         return score
+
+
+class ScoreBatch:
+    """Scores of many users sharing maximum, timestamp and progress.
+
+    User identifiers, given scores and (optional) comments are kept as
+    parallel sequences, e.g. lists or :class:`array.array`. Score
+    representations are only built while iterating.
+    """
+
+    __slots__ = (
+        "user_ids",
+        "scores_given",
+        "comments",
+        "score_maximum",
+        "timestamp",
+        "activity_progress",
+        "grading_progress",
+    )
+
+    def __init__(
+        self,
+        user_ids,
+        scores_given,
+        score_maximum=100,
+        timestamp=None,
+        activity_progress="Completed",
+        grading_progress="FullyGraded",
+        comments=None,
+    ):
+        if len(scores_given) != len(user_ids):
+            raise ValueError("Arguments user_ids and scores_given differ in length.")
+
+        if comments is not None and len(comments) != len(user_ids):
+            raise ValueError("Arguments user_ids and comments differ in length.")
+
+        validate_progress(activity_progress, grading_progress)
+
+        self.user_ids = user_ids
+        self.scores_given = scores_given
+        self.comments = comments
+        self.score_maximum = score_maximum
+        self.activity_progress = activity_progress
+        self.grading_progress = grading_progress
+
+        if timestamp:
+            self.timestamp = ts2str(timestamp)
+        else:
+            self.timestamp = ts2str(datetime.now())
+
+    def __len__(self):
+        return len(self.user_ids)
+
+    def __iter__(self):
+        """Yields scores in 'application/vnd.ims.lis.v1.score+json'
+        representation one by one."""
+        comments = self.comments
+        if comments is None:
+            comments = repeat(None)
+
+        for user_id, score_given, comment in zip(
+            self.user_ids, self.scores_given, comments
+        ):
+            score = {
+                "userId": user_id,
+                "timestamp": self.timestamp,
+                "gradingProgress": self.grading_progress,
+                "activityProgress": self.activity_progress,
+            }
+
+            if score_given is not None:
+                score["scoreGiven"] = score_given
+                score["scoreMaximum"] = self.score_maximum
+
+            if comment:
+                score["comment"] = comment
+
+            yield score
+
+    def __repr__(self):
+        return f"<ScoreBatch: {len(self)} scores>"
@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class LTIConfig(AppConfig):
     name = "lti_tool"
     verbose_name = "LTI Tool"
+
+    def ready(self):
+        from lti_tool import signals  # noqa: F401
@@ -1,9 +1,61 @@
+import pickle
+from collections import OrderedDict
 from hashlib import sha1
+from secrets import token_hex
+from threading import Lock
 
 from django.contrib.auth.backends import BaseBackend
 from django.contrib.auth.models import User
+from django.core.cache import cache
 
-from lti_tool.models import LTIUser, Roles
+from lti_tool.models import LTIUser, Roles, get_or_create, user_generation_key
+from lti_tool.routers import use_primary
+from lti_tool.timing import phase
+
+
+class UserCache:
+    """Bounded in-process LRU of users with their LTI user.
+
+    Entries are tagged with a generation and stored pickled, every hit
+    returns a fresh copy.
+    """
+
+    def __init__(self, maxsize=1024):
+        self.maxsize = maxsize
+        self._users = OrderedDict()
+        self._lock = Lock()
+
+    def get(self, user_id, generation):
+        with self._lock:
+            entry = self._users.get(user_id)
+            if entry is None:
+                return None
+
+            cached, data = entry
+            if cached != generation:
+                del self._users[user_id]
+                return None
+
+            self._users.move_to_end(user_id)
+
+        return pickle.loads(data)
+
+    def set(self, user_id, generation, user):
+        data = pickle.dumps(user)
+
+        with self._lock:
+            self._users[user_id] = (generation, data)
+            self._users.move_to_end(user_id)
+
+            if len(self._users) > self.maxsize:
+                self._users.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._users.clear()
+
+
+users = UserCache()
 
 
 class LTIBackend(BaseBackend):
@@ -17,28 +69,46 @@ class LTIBackend(BaseBackend):
 
         username = sha1(bytes(f"{iss}{sub}", "ascii")).hexdigest()
 
-        user, created = User.objects.get_or_create(
-            username=username, defaults=LTIUser.get_base_fields(claims)
-        )
-
-        fields = LTIUser.get_lti_fields(claims, platform)
-        lti_user, created = LTIUser.objects.get_or_create(user=user, defaults=fields)
+        with phase(request, "user"):
+            user, _ = get_or_create(
+                User, {"username": username}, LTIUser.get_base_fields(claims)
+            )
 
-        if not created:
-            lti_user.update(fields)
+            fields = LTIUser.get_lti_fields(claims, platform)
+            lti_user, _ = LTIUser.upsert(fields, user=user)
 
-        fields = Roles.get_fields(claims)
-        roles, created = Roles.objects.get_or_create(
-            lti_user=lti_user, context=context, defaults=fields
-        )
+            # Spare a query on access of user.lti
+            user.lti = lti_user
 
-        if not created:
-            roles.update(fields)
+        with phase(request, "roles"):
+            fields = Roles.get_fields(claims)
+            Roles.upsert(fields, lti_user=lti_user, context=context)
 
         return user
 
     def get_user(self, user_id):
-        try:
-            return User.objects.get(pk=user_id)
-        except User.DoesNotExist:
-            return None
+        # Users are cached per process, keeping password hashes out of the
+        # shared cache. It holds a generation per user instead, replaced
+        # when the user or its LTI user is saved or deleted.
+        generation_key = user_generation_key(user_id)
+        generation = cache.get(generation_key)
+        if generation is None:
+            cache.add(generation_key, token_hex(8))
+            generation = cache.get(generation_key)
+
+        user = users.get(user_id, generation)
+
+        if user is None:
+            try:
+                # Users created by the previous request, e.g. a first launch,
+                # may not be replicated yet
+                with use_primary():
+                    user = User.objects.select_related("lti").get(pk=user_id)
+            except User.DoesNotExist:
+                return None
+
+            # Not cached without a shared cache to invalidate entries
+            if generation is not None:
+                users.set(user_id, generation, user)
+
+        return user
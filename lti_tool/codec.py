@@ -0,0 +1,67 @@
+"""JSON codec of platform payloads, launch claims and stored keys.
+
+``LTI_JSON_CODEC`` names a codec class by its dotted path. By default orjson
+is used if it is installed, otherwise the standard library.
+"""
+
+import json
+from functools import lru_cache
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+
+class StdlibCodec:
+    def dumps(self, obj, sort_keys=False):
+        """Serializes an object to compact JSON.
+
+        :rtype: UTF-8 encoded bytes
+        """
+        data = json.dumps(obj, sort_keys=sort_keys, separators=(",", ":"))
+        return data.encode("utf-8")
+
+    def loads(self, data):
+        """Parses JSON.
+
+        :param data: str or bytes
+        """
+        return json.loads(data)
+
+
+class OrjsonCodec:
+    def __init__(self):
+        import orjson
+
+        self._orjson = orjson
+
+    def dumps(self, obj, sort_keys=False):
+        option = self._orjson.OPT_SORT_KEYS if sort_keys else None
+        return self._orjson.dumps(obj, option=option)
+
+    def loads(self, data):
+        return self._orjson.loads(data)
+
+
+@lru_cache(maxsize=None)
+def get_codec():
+    """Gets the configured codec, created on first use.
+
+    :rtype: codec providing ``dumps(obj, sort_keys=False)`` and
+        ``loads(data)``
+    """
+    path = getattr(settings, "LTI_JSON_CODEC", None)
+    if path:
+        return import_string(path)()
+
+    try:
+        return OrjsonCodec()
+    except ImportError:
+        return StdlibCodec()
+
+
+def dumps(obj, sort_keys=False):
+    return get_codec().dumps(obj, sort_keys=sort_keys)
+
+
+def loads(data):
+    return get_codec().loads(data)
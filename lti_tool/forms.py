@@ -1,7 +1,6 @@
 from django import forms
 from django.core.exceptions import ValidationError
 from django.utils.translation import gettext_lazy as _
-from jwcrypto import jwk
 
 
 class KeyForm(forms.ModelForm):
@@ -32,13 +31,19 @@ class KeyForm(forms.ModelForm):
     def __init__(self, *args, **kwargs):
         instance = kwargs.get("instance", None)
         if instance:
+            # Parse key once for both representations
+            key = instance.jwk
+            priv_key = key.export_to_pem(private_key=True, password=None)
+            pub_key = key.export_to_pem(private_key=False, password=None)
             kwargs["initial"] = {
-                "priv_key": instance.pem(private=True),
-                "pub_key": instance.pem(private=False),
+                "priv_key": priv_key.decode("ascii"),
+                "pub_key": pub_key.decode("ascii"),
             }
         super().__init__(*args, **kwargs)
 
     def clean(self):
+        from jwcrypto import jwk
+
         cleaned_data = super().clean()
 
         if cleaned_data["priv_key"]:
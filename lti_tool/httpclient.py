@@ -1,31 +1,105 @@
-import requests
+from collections import OrderedDict
+from hashlib import sha1
+from threading import Lock
+from time import perf_counter, time
+
 from django.core.cache import cache
 
+from lti_tool import metrics
+from lti_tool.codec import dumps, loads
 from lti_tool.exceptions import LTIRequestError, LTITokenRetrieveError
 from lti_tool.jwt import bearer_jwt
 
 
+class TokenCache:
+    """Bounded in-process LRU of access tokens.
+
+    Sits in front of Django's cache. Entries expire with their shared entry.
+    """
+
+    def __init__(self, maxsize=256):
+        self.maxsize = maxsize
+        self._tokens = OrderedDict()
+        self._lock = Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._tokens.get(key)
+            if entry is None:
+                return None
+
+            access_token, expires = entry
+            if expires <= time():
+                del self._tokens[key]
+                return None
+
+            self._tokens.move_to_end(key)
+            return access_token
+
+    def set(self, key, access_token, expires):
+        with self._lock:
+            self._tokens[key] = (access_token, expires)
+            self._tokens.move_to_end(key)
+
+            if len(self._tokens) > self.maxsize:
+                self._tokens.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._tokens.clear()
+
+
+tokens = TokenCache()
+
+
 class HTTPClient:
     def __init__(self):
-        self.session = requests.Session()
+        self._session = None
+
+    @property
+    def session(self):
+        # Deferred import keeps requests out of startup, e.g. of management
+        # commands.
+        if self._session is None:
+            import requests
+
+            self._session = requests.Session()
+
+        return self._session
+
+    def _request(
+        self, method, url, context, headers=None, kind="other", platform=None, **kwargs
+    ):
+        import requests
 
-    def _request(self, method, url, context, headers=None, **kwargs):
         headers = headers or {}
 
+        if "json" in kwargs:
+            # Serialize with the configured codec instead of requests' own
+            kwargs["data"] = dumps(kwargs.pop("json"))
+            headers.setdefault("Content-Type", "application/json")
+
         if context:
+            platform = context.platform_id
             auth_header = self._auth_header(context)
             headers.update(auth_header)
 
+        status = "error"
+        start = perf_counter()
+
         try:
             response = self.session.request(
                 method=method, url=url, headers=headers, **kwargs
             )
+            status = response.status_code
 
             response.raise_for_status()
         except requests.exceptions.RequestException as e:
             # NOTE Platform error handling is not specified. Raise every error
             # for now.
             raise LTIRequestError from e
+        finally:
+            metrics.observe_request(platform, kind, status, perf_counter() - start)
 
         return response
 
@@ -50,23 +124,41 @@ class HTTPClient:
         }
 
         try:
-            data = self.post(platform.access_token_url, data=data).json()
+            resp = self.post(
+                platform.access_token_url, data=data, kind="token", platform=platform.pk
+            )
         except LTIRequestError as e:
             raise LTITokenRetrieveError("Could not retrieve access token.") from e
 
-        return data
+        return loads(resp.content)
 
     def _auth_header(self, context):
-        cache_key = f"context_{context.pk}_token"
-        access_token, scope = cache.get(cache_key, (None, None))
+        # Access tokens are granted per platform. Share them between all
+        # contexts of a platform requesting the same scope.
+        local_key = (context.platform_id, tuple(context.scope))
+        access_token = tokens.get(local_key)
+
+        if access_token is None:
+            scope = " ".join(sorted(context.scope))
+            digest = sha1(bytes(scope, "utf-8")).hexdigest()
+            cache_key = f"lti_token_{context.platform_id}_{digest}"
+
+            # Adopt expiry of the shared entry
+            access_token, expires = cache.get(cache_key, (None, None))
+            if access_token:
+                tokens.set(local_key, access_token, expires)
+
+        metrics.observe_token_cache(context.platform_id, bool(access_token))
 
-        # Update if token has expired or scope has changed
-        if not access_token or scope != context.scope:
+        # Update if token has expired
+        if not access_token:
             data = self._access_token(context.platform, context.scope)
 
             access_token = data["access_token"]
             timeout = data["expires_in"] - 300  # Compensate clock skew
+            expires = time() + timeout
 
-            cache.set(cache_key, (access_token, context.scope), timeout=timeout)
+            cache.set(cache_key, (access_token, expires), timeout=timeout)
+            tokens.set(local_key, access_token, expires)
 
         return {"Authorization": f"Bearer {access_token}"}
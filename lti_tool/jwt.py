@@ -1,7 +1,5 @@
 from secrets import token_hex
 
-from jwcrypto import jwt
-
 
 def bearer_jwt(platform):
     claims = {
@@ -31,6 +29,8 @@ def form_jwt(platform, extra_claims=None):
 
 
 def _tokenize(platform, claims, default_claims):
+    from jwcrypto import jwt
+
     header = {"alg": "RS256", "type": "JWT", "kid": platform.key.kid}
 
     token = jwt.JWT(header=header, claims=claims, default_claims=default_claims)
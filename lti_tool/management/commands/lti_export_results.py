@@ -0,0 +1,138 @@
+import csv
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from threading import Lock, local
+
+from django.core.management.base import BaseCommand, CommandError
+
+from lti_tool.ags import LineItemManager
+from lti_tool.codec import dumps
+from lti_tool.exceptions import LTIRequestError
+from lti_tool.httpclient import HTTPClient
+from lti_tool.models import Context
+
+FIELDS = [
+    "platform",
+    "context",
+    "lineitem",
+    "label",
+    "userId",
+    "resultScore",
+    "resultMaximum",
+    "comment",
+]
+
+
+class Command(BaseCommand):
+    help = "Exports AGS results of all lineitems of all contexts."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--platform",
+            type=int,
+            action="append",
+            dest="platforms",
+            help="Restrict export to platform with given ID (repeatable).",
+        )
+        parser.add_argument(
+            "--format", choices=["csv", "jsonl"], default="csv", dest="fmt"
+        )
+        parser.add_argument(
+            "--output", help="Write to file instead of standard output."
+        )
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=4,
+            help="Number of contexts fetched concurrently.",
+        )
+
+    def handle(self, *args, platforms, fmt, output, workers, **options):
+        if workers < 1:
+            raise CommandError("Argument --workers has to be at least 1.")
+
+        contexts = (
+            Context.objects.exclude(_lineitems="")
+            .exclude(_lineitems__isnull=True)
+            .select_related("platform", "platform__key")
+            .order_by("platform", "pk")
+        )
+        if platforms:
+            contexts = contexts.filter(platform__in=platforms)
+
+        if output:
+            with open(output, "w", newline="") as out:
+                failed = self.export(contexts, out, fmt, workers)
+        else:
+            failed = self.export(contexts, self.stdout, fmt, workers)
+
+        if failed:
+            raise CommandError(f"Export of {failed} context(s) failed.")
+
+    def export(self, contexts, out, fmt, workers):
+        if fmt == "csv":
+            writer = csv.DictWriter(out, FIELDS, lineterminator="\n")
+            writer.writeheader()
+            write = writer.writerow
+        else:
+
+            def write(row):
+                out.write(dumps(row).decode("utf-8") + "\n")
+
+        # Workers write the rows of one lineitem at a time, so memory is
+        # bounded by the largest lineitem per worker.
+        lock = Lock()
+        clients = local()
+        failed = 0
+
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            pending = {}
+
+            def drain(return_when):
+                nonlocal failed
+                done, _ = wait(pending, return_when=return_when)
+                for future in done:
+                    context = pending.pop(future)
+                    try:
+                        future.result()
+                    except LTIRequestError as e:
+                        failed += 1
+                        self.stderr.write(f"Context {context.context_id}: {e!r}")
+
+            for context in contexts.iterator():
+                future = executor.submit(self.fetch, context, clients, lock, write)
+                pending[future] = context
+
+                # Bound the number of contexts held in memory
+                if len(pending) >= workers * 2:
+                    drain(FIRST_COMPLETED)
+
+            while pending:
+                drain(FIRST_COMPLETED)
+
+        return failed
+
+    def fetch(self, context, clients, lock, write):
+        # requests.Session is not thread-safe. One client per thread and
+        # platform, it keeps connections alive. Access tokens are shared
+        # through the token cache.
+        if not hasattr(clients, "platforms"):
+            clients.platforms = {}
+        client = clients.platforms.setdefault(context.platform_id, HTTPClient())
+
+        manager = LineItemManager(context, client)
+
+        for lineitem in manager.list():
+            rows = []
+            for result in lineitem.get_results():
+                row = {
+                    "platform": context.platform_id,
+                    "context": context.context_id,
+                    "lineitem": lineitem.id,
+                    "label": lineitem._data.get("label"),
+                }
+                row.update({key: result.get(key) for key in FIELDS[4:]})
+                rows.append(row)
+
+            with lock:
+                for row in rows:
+                    write(row)
@@ -0,0 +1,208 @@
+import time
+from datetime import timedelta
+from importlib import import_module
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import router, transaction
+from django.db.models.deletion import Collector
+from django.utils import timezone
+
+from lti_tool.models import Context, Resource, Roles
+
+# Option, model, lookup of the last launch and dependent rows as (model,
+# lookup of the parent) tuples. Children first, so cascades from parents stay
+# within a batch. LTI users are deleted along with their Django user.
+TABLES = [
+    ("roles", Roles, "last_launch", []),
+    ("resources", Resource, "last_launch", []),
+    ("users", User, "lti__last_launch", [(Roles, "lti_user__user")]),
+    ("contexts", Context, "last_launch", [(Roles, "context"), (Resource, "context")]),
+]
+
+
+class Command(BaseCommand):
+    help = (
+        "Deletes launch data not launched within a retention period, in batches. "
+        "Rows without a recorded launch are kept."
+    )
+
+    def add_arguments(self, parser):
+        for name, model, _, _ in TABLES:
+            parser.add_argument(
+                f"--{name}",
+                type=int,
+                metavar="DAYS",
+                help=f"Delete {model._meta.verbose_name_plural} not launched "
+                "within DAYS days, including dependent rows.",
+            )
+        parser.add_argument(
+            "--sessions", action="store_true", help="Clear expired sessions."
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=500,
+            help="Number of rows deleted per transaction.",
+        )
+        parser.add_argument(
+            "--sleep",
+            type=float,
+            default=0.1,
+            help="Seconds to wait between batches.",
+        )
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Report the number of rows which would be deleted.",
+        )
+
+    def handle(self, *args, sessions, batch_size, sleep, dry_run, **options):
+        if batch_size < 1:
+            raise CommandError("Argument --batch-size has to be at least 1.")
+
+        now = timezone.now()
+        for name, model, lookup, dependents in TABLES:
+            days = options[name]
+            if days is None:
+                continue
+            if days < 0:
+                raise CommandError(f"Argument --{name} must not be negative.")
+
+            counts = self.prune(
+                model,
+                lookup,
+                dependents,
+                now - timedelta(days=days),
+                batch_size,
+                sleep,
+                dry_run,
+            )
+            for label, count in sorted(counts.items()):
+                verb = "Would delete" if dry_run else "Deleted"
+                self.stdout.write(f"{verb} {count} {label}")
+
+        if sessions:
+            if dry_run:
+                self.stdout.write("Would clear expired sessions")
+            else:
+                engine = import_module(settings.SESSION_ENGINE)
+                try:
+                    engine.SessionStore.clear_expired()
+                except NotImplementedError:
+                    raise CommandError(
+                        f"Session engine {settings.SESSION_ENGINE} does not "
+                        "support clearing expired sessions."
+                    )
+                self.stdout.write("Cleared expired sessions")
+
+    def prune(self, model, lookup, dependents, cutoff, batch_size, sleep, dry_run):
+        """Deletes rows last launched before ``cutoff`` in batches.
+
+        Dependent rows are deleted in batches of their own before each batch
+        of parents, so a transaction deletes about ``batch_size`` rows.
+
+        :param model: model to delete from
+        :param lookup: lookup of the last launch, e.g. ``last_launch``
+        :param dependents: list of (model, lookup of the parent) tuples
+        :param cutoff: delete rows with an earlier last launch
+        :rtype: dict of deleted rows per model label
+        """
+        db = router.db_for_write(model)
+        launched_before = {f"{lookup}__lt": cutoff}
+        queryset = model._default_manager.using(db).filter(**launched_before)
+        counts = {}
+
+        for pks in self.batches(queryset, batch_size, sleep):
+            # A dry run counts dependent rows along with their parents
+            if not dry_run:
+                for dependent, parent in dependents:
+                    deleted = self.prune_dependents(
+                        dependent, parent, pks, lookup, cutoff, batch_size, sleep, db
+                    )
+                    self.add_counts(counts, deleted)
+
+            deleted = self.delete(model, pks, launched_before, db, dry_run)
+            self.add_counts(counts, deleted)
+
+        return counts
+
+    def prune_dependents(
+        self, model, parent, parent_pks, lookup, cutoff, batch_size, sleep, db
+    ):
+        """Deletes rows depending on a batch of parents in batches.
+
+        :param model: dependent model
+        :param parent: lookup of the parent from the dependent model
+        :rtype: dict of deleted rows per model label
+        """
+        parent_launched_before = {f"{parent}__{lookup}__lt": cutoff}
+        queryset = model._default_manager.using(db).filter(
+            **{f"{parent}__in": parent_pks}, **parent_launched_before
+        )
+        counts = {}
+
+        for pks in self.batches(queryset, batch_size, sleep):
+            deleted = self.delete(model, pks, parent_launched_before, db, False)
+            self.add_counts(counts, deleted)
+
+        return counts
+
+    def batches(self, queryset, batch_size, sleep):
+        """Yields primary keys of ``queryset`` in batches, waiting ``sleep``
+        seconds in between."""
+        last_pk = 0
+
+        while True:
+            pks = list(
+                queryset.filter(pk__gt=last_pk)
+                .order_by("pk")
+                .values_list("pk", flat=True)[:batch_size]
+            )
+            if not pks:
+                return
+
+            yield pks
+
+            if len(pks) < batch_size:
+                return
+            last_pk = pks[-1]
+            if sleep:
+                time.sleep(sleep)
+
+    def delete(self, model, pks, launched_before, db, dry_run):
+        """Deletes a batch of rows, including dependent rows.
+
+        :param launched_before: lookup re-checking the cutoff
+        :rtype: dict of deleted rows per model label
+        """
+        batch = model._default_manager.using(db).filter(pk__in=pks)
+
+        if dry_run:
+            return self.collect(batch, db)
+
+        with transaction.atomic(using=db):
+            # Re-check the cutoff, rows may have been launched meanwhile
+            _, deleted = batch.filter(**launched_before).delete()
+
+        return deleted
+
+    def add_counts(self, counts, deleted):
+        for label, count in deleted.items():
+            counts[label] = counts.get(label, 0) + count
+
+    def collect(self, queryset, db):
+        """Counts rows a deletion of ``queryset`` would remove, per model label."""
+        collector = Collector(using=db)
+        collector.collect(queryset)
+
+        counts = {}
+        for model, instances in collector.data.items():
+            label = model._meta.label
+            counts[label] = counts.get(label, 0) + len(instances)
+        for fast in collector.fast_deletes:
+            label = fast.model._meta.label
+            counts[label] = counts.get(label, 0) + fast.count()
+
+        return counts
@@ -0,0 +1,132 @@
+from bisect import bisect_left
+from collections import defaultdict
+from threading import Lock
+
+from django.conf import settings
+
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+
+def enabled():
+    return getattr(settings, "LTI_METRICS", False)
+
+
+def _labels(labels):
+    pairs = ",".join(f'{k}="{v}"' for k, v in labels)
+    return f"{{{pairs}}}" if pairs else ""
+
+
+class Registry:
+    """In-process counters and histograms.
+
+    Every worker process aggregates its own samples.
+    """
+
+    def __init__(self):
+        self._lock = Lock()
+        self._help = {}
+        self._counters = defaultdict(float)
+        self._histograms = {}
+
+    def describe(self, name, kind, text):
+        self._help[name] = (kind, text)
+
+    def inc(self, name, labels, value=1):
+        """Increments a counter.
+
+        :param labels: tuple of (label, value) tuples, values are strings
+        """
+        with self._lock:
+            self._counters[(name, labels)] += value
+
+    def observe(self, name, labels, value):
+        """Adds a sample to a histogram.
+
+        :param labels: tuple of (label, value) tuples, values are strings
+        """
+        with self._lock:
+            hist = self._histograms.get((name, labels))
+            if hist is None:
+                # Bucket counts (last is +Inf), sum
+                hist = self._histograms[(name, labels)] = [0] * (len(BUCKETS) + 1)
+                hist.append(0.0)
+
+            hist[bisect_left(BUCKETS, value)] += 1
+            hist[-1] += value
+
+    def clear(self):
+        with self._lock:
+            self._counters.clear()
+            self._histograms.clear()
+
+    def render(self):
+        """Returns all samples in Prometheus text format."""
+        with self._lock:
+            counters = sorted(self._counters.items())
+            histograms = sorted((k, list(v)) for k, v in self._histograms.items())
+
+        lines = []
+        described = set()
+
+        def describe(name):
+            if name not in described and name in self._help:
+                kind, text = self._help[name]
+                lines.append(f"# HELP {name} {text}")
+                lines.append(f"# TYPE {name} {kind}")
+                described.add(name)
+
+        for (name, labels), value in counters:
+            describe(name)
+            lines.append(f"{name}{_labels(labels)} {value:g}")
+
+        for (name, labels), hist in histograms:
+            describe(name)
+
+            count = 0
+            for bound, n in zip(BUCKETS + ("+Inf",), hist):
+                count += n
+                le = labels + (("le", bound),)
+                lines.append(f"{name}_bucket{_labels(le)} {count}")
+
+            lines.append(f"{name}_sum{_labels(labels)} {hist[-1]:g}")
+            lines.append(f"{name}_count{_labels(labels)} {count}")
+
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+registry.describe(
+    "lti_platform_requests_total",
+    "counter",
+    "Requests to platforms by platform, kind and status.",
+)
+registry.describe(
+    "lti_platform_request_duration_seconds",
+    "histogram",
+    "Duration of requests to platforms by platform and kind.",
+)
+registry.describe(
+    "lti_token_cache_total",
+    "counter",
+    "Access token cache lookups by platform and result.",
+)
+
+
+def observe_request(platform, kind, status, duration):
+    """Records a request to a platform if metrics are enabled."""
+    if not enabled():
+        return
+
+    labels = (("platform", str(platform)), ("kind", kind))
+    registry.inc("lti_platform_requests_total", labels + (("status", str(status)),))
+    registry.observe("lti_platform_request_duration_seconds", labels, duration)
+
+
+def observe_token_cache(platform, hit):
+    """Records an access token cache lookup if metrics are enabled."""
+    if not enabled():
+        return
+
+    labels = (("platform", str(platform)), ("result", "hit" if hit else "miss"))
+    registry.inc("lti_token_cache_total", labels)
@@ -1,14 +1,79 @@
 from django.conf import settings
 
+from lti_tool.routers import request_scope
+from lti_tool.signals import phases_timed
+from lti_tool.timing import PhaseTimer, phase
+
+
+def _timing_settings():
+    server_timing = getattr(settings, "LTI_SERVER_TIMING", False)
+    return server_timing, server_timing or getattr(settings, "LTI_TIMING", False)
+
+
+def _report(sender, request, response, timer, server_timing):
+    if timer.phases:
+        phases_timed.send(sender=sender, request=request, phases=timer.phases)
+
+        if server_timing:
+            response["Server-Timing"] = timer.server_timing()
+
 
 class LTIMiddleware:
     def __init__(self, get_response):
         self.get_response = get_response
+        self.server_timing, self.timing = _timing_settings()
 
     def __call__(self, request):
         request_csrf_token = request.POST.get("state", "")
         if request_csrf_token:
             request.META[settings.CSRF_HEADER_NAME] = request_csrf_token
 
+        with request_scope():
+            if not self.timing:
+                return self.get_response(request)
+
+            # LTITimingMiddleware reports after the session has been written
+            if getattr(request, "lti_timer", None) is not None:
+                self.time_session(request)
+                return self.get_response(request)
+
+            timer = request.lti_timer = PhaseTimer()
+            response = self.get_response(request)
+
+        _report(self.__class__, request, response, timer, self.server_timing)
+        return response
+
+    def time_session(self, request):
+        session = getattr(request, "session", None)
+        if session is None:
+            return
+
+        save = session.save
+
+        def timed_save(*args, **kwargs):
+            with phase(request, "session"):
+                return save(*args, **kwargs)
+
+        session.save = timed_save
+
+
+class LTITimingMiddleware:
+    """Reports timed phases including the session write.
+
+    Optional, place it before ``SessionMiddleware``. Without it, phases are
+    reported by :class:`LTIMiddleware` before the session is written.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.server_timing, self.timing = _timing_settings()
+
+    def __call__(self, request):
+        if not self.timing:
+            return self.get_response(request)
+
+        timer = request.lti_timer = PhaseTimer()
         response = self.get_response(request)
+
+        _report(self.__class__, request, response, timer, self.server_timing)
         return response
@@ -3,7 +3,8 @@ from django.core.exceptions import PermissionDenied
 from django.views.generic.detail import SingleObjectMixin
 
 from lti_tool.exceptions import LTIContextError, LTIImproperlyConfigured
-from lti_tool.models import Context, Platform, Resource, ResourceLink
+from lti_tool.models import Context, Platform, Resource, ResourceLink, Roles
+from lti_tool.timing import phase
 
 
 class LTIResourceMixin(SingleObjectMixin):
@@ -13,13 +14,7 @@ class LTIResourceMixin(SingleObjectMixin):
         if not id:
             return None
 
-        context, created = Context.objects.get_or_create(
-            context_id=id, platform=platform, defaults=fields
-        )
-
-        if not created:
-            context.update(fields)
-
+        context, _ = Context.upsert(fields, context_id=id, platform=platform)
         return context
 
     def get_resource(self, claims, context, platform):
@@ -39,30 +34,26 @@ class LTIResourceMixin(SingleObjectMixin):
         fields["resource_link"] = resource_link
         fields["context"] = context
 
-        resource, created = Resource.objects.get_or_create(
-            resource_id=id, platform=platform, defaults=fields
-        )
-
-        if not created:
-            resource.update(fields)
-
+        resource, _ = Resource.upsert(fields, resource_id=id, platform=platform)
         return resource
 
     def dispatch(self, request, *args, **kwargs):
-        platform = Platform.objects.get(pk=request.session["lti-platform"])
-        claims = request.session["lti-claims"]
+        with phase(request, "platform"):
+            platform = Platform.objects.get_cached(pk=request.session["lti-platform"])
+            claims = request.session["lti-claims"]
+            platform.update_claim(claims)
 
-        platform_fields = platform.get_fields(claims)
-        if platform_fields:
-            platform.update(platform_fields)
+        with phase(request, "context"):
+            context = self.get_context(claims, platform)
 
-        context = self.get_context(claims, platform)
-        resource = self.get_resource(claims, context, platform)
+        with phase(request, "resource"):
+            resource = self.get_resource(claims, context, platform)
 
         user = authenticate(request, claims=claims, context=context, platform=platform)
 
         if user is not None:
-            login(request, user)
+            with phase(request, "login"):
+                login(request, user)
 
         kwargs.update(
             {
@@ -87,7 +78,8 @@ class LTIRoleMixin:
                 f"the LTIResourceMixin is applied."
             )
 
-        roles = request.user.lti.roles(context)
+        # Role may be a role URI or a roles.RoleFlag
+        roles = Roles.objects.get_cached(request.user.lti.pk, context.pk)
         if self.role and self.role not in roles:
             raise PermissionDenied
 
@@ -1,8 +1,17 @@
+from datetime import timedelta
+from functools import lru_cache
+from hashlib import sha1
+
+from django.conf import settings
 from django.contrib.auth.models import User
-from django.db import models
-from jwcrypto import jwk
+from django.core.cache import cache
+from django.db import IntegrityError, models, router, transaction
+from django.db.models.query import ModelIterable
+from django.db.models.signals import post_save
+from django.utils import timezone
 
 from lti_tool.ags import LineItem, LineItemManager
+from lti_tool.codec import dumps, loads
 from lti_tool.exceptions import (
     LTIKeyRetrieveError,
     LTINoLineItem,
@@ -10,57 +19,349 @@ from lti_tool.exceptions import (
     LTIResourceError,
 )
 from lti_tool.httpclient import HTTPClient
+from lti_tool.roles import RoleSet
+
+LAUNCH_RESOLUTION = timedelta(days=1)
+UPSERT_ATTEMPTS = 3
+
+
+def get_or_create(model, lookup, defaults):
+    """Gets or creates an object, tolerating concurrent creation.
+
+    If the insert conflicts with a row created by a concurrent transaction,
+    that row is fetched with a locking read. Unlike the plain read of
+    :meth:`QuerySet.get_or_create`, it also sees rows committed after the
+    snapshot of a repeatable read transaction.
+
+    :param model: model class
+    :param lookup: dictionary of unique lookup fields
+    :param defaults: dictionary of further fields of a created object
+    :rtype: tuple of object and whether it has been created
+    """
+    db = router.db_for_write(model)
+    queryset = model._default_manager.using(db)
+
+    for attempt in range(UPSERT_ATTEMPTS):
+        try:
+            return queryset.get(**lookup), False
+        except model.DoesNotExist:
+            pass
+
+        try:
+            with transaction.atomic(using=db):
+                return queryset.create(**lookup, **defaults), True
+        except IntegrityError:
+            if attempt + 1 == UPSERT_ATTEMPTS:
+                raise
+
+        try:
+            with transaction.atomic(using=db):
+                return queryset.select_for_update().get(**lookup), False
+        except model.DoesNotExist:
+            # Deleted meanwhile or conflicting on another constraint
+            pass
 
 
 class Updatable(models.Model):
+    # Digest of all JSON field values. Detects changes of nested structures
+    # without comparing them. Kept in sync by save(); writes bypassing it,
+    # e.g. QuerySet.update() of a JSON field, have to reset it to "".
+    json_digest = models.CharField(max_length=40, editable=False, default="")
+    # Time of the last launch, refreshed at most once per LAUNCH_RESOLUTION
+    last_launch = models.DateTimeField(editable=False, null=True, db_index=True)
+
     class Meta:
         abstract = True
 
-    def update(self, fields):
-        """Updates only modified fields
+    @classmethod
+    @lru_cache(maxsize=None)
+    def _json_fields(cls):
+        return tuple(
+            f.name for f in cls._meta.concrete_fields if isinstance(f, models.JSONField)
+        )
+
+    @staticmethod
+    def _digest(values):
+        return sha1(dumps(values, sort_keys=True)).hexdigest()
+
+    def _apply(self, fields):
+        """Sets modified fields.
 
         :param fields: dictionary representing model fields
+        :rtype: list of modified field names
         """
+        json_fields = self._json_fields()
+        digest = self._digest(
+            [fields[k] if k in fields else getattr(self, k) for k in json_fields]
+        )
+        json_unchanged = digest == self.json_digest
+
         updated = []
         for key, value in fields.items():
-            if getattr(self, key) != value:
-                setattr(self, key, value)
-                updated.append(key)
+            field = self._meta.get_field(key)
+
+            if field.is_relation:
+                # Compare keys to avoid loading related objects
+                pk = value.pk if value is not None else None
+                if getattr(self, field.attname) == pk:
+                    continue
+            elif key in json_fields:
+                if json_unchanged or getattr(self, key) == value:
+                    continue
+            elif getattr(self, key) == value:
+                continue
+
+            setattr(self, key, value)
+            updated.append(key)
+
+        if not json_unchanged:
+            self.json_digest = digest
+            updated.append("json_digest")
+
+        now = timezone.now()
+        if self.last_launch is None or now - self.last_launch > LAUNCH_RESOLUTION:
+            self.last_launch = now
+            updated.append("last_launch")
+
+        return updated
+
+    def save(self, *args, **kwargs):
+        update_fields = kwargs.get("update_fields")
+        json_fields = self._json_fields()
+
+        if update_fields is None:
+            self.json_digest = self._digest([getattr(self, k) for k in json_fields])
+
+            if self.last_launch is None:
+                self.last_launch = timezone.now()
+        elif "json_digest" not in update_fields:
+            # Partial saves of JSON fields keep the digest in sync
+            if any(k in update_fields for k in json_fields):
+                self.json_digest = self._digest([getattr(self, k) for k in json_fields])
+                kwargs["update_fields"] = [*update_fields, "json_digest"]
+
+        super().save(*args, **kwargs)
+
+    def update(self, fields):
+        """Updates only modified fields
+
+        Saving is skipped if no field has been modified.
+
+        :param fields: dictionary representing model fields
+        """
+        updated = self._apply(fields)
+
+        if updated:
+            self.save(update_fields=updated)
 
-        # Empty 'updated' iterable will skip save
-        self.save(update_fields=updated)
+    @classmethod
+    def upsert(cls, fields, **lookup):
+        """Updates modified fields of an object or creates it.
+
+        Converges if the same object is created concurrently, see
+        :func:`get_or_create`.
+
+        :param fields: dictionary representing model fields
+        :param lookup: unique lookup of the object
+        :rtype: tuple of object and whether it has been created
+        """
+        obj, created = get_or_create(cls, lookup, fields)
+
+        if not created:
+            obj.update(fields)
+
+        return obj, created
+
+    @classmethod
+    def bulk_upsert(cls, items, batch_size=None):
+        """Updates modified fields of many objects or creates them.
+
+        Existing objects are read with a single query, modified ones written
+        with :meth:`QuerySet.bulk_update` and missing ones inserted with
+        :meth:`QuerySet.bulk_create`. If an insert conflicts with a concurrent
+        creation, missing objects are upserted one by one instead.
+        ``post_save`` is sent for each written object, as bulk operations do
+        not send signals.
+
+        :param items: iterable of (fields, lookup) tuples, as passed to
+            :meth:`upsert`. All lookups have to use the same fields.
+        :param batch_size: passed to the bulk operations
+        :rtype: tuple of numbers of updated and created objects
+        """
+        # Later items win over earlier ones with the same lookup
+        pending = {
+            cls._lookup_key(lookup): (fields, lookup) for fields, lookup in items
+        }
+        if not pending:
+            return 0, 0
+
+        names = sorted(next(iter(pending.values()))[1])
+        attnames = [cls._meta.get_field(name).attname for name in names]
+        db = router.db_for_write(cls)
+        queryset = cls._default_manager.using(db)
+
+        query = models.Q()
+        for _, lookup in pending.values():
+            query |= models.Q(**lookup)
+
+        modified = []
+        update_fields = set()
+        for obj in queryset.filter(query):
+            key = tuple(getattr(obj, attname) for attname in attnames)
+            item = pending.pop(key, None)
+            if item is None:
+                continue
+
+            updated = obj._apply(item[0])
+            if updated:
+                modified.append((obj, updated))
+                update_fields.update(updated)
+
+        if modified:
+            queryset.bulk_update(
+                [obj for obj, _ in modified], update_fields, batch_size=batch_size
+            )
+
+        for obj, updated in modified:
+            post_save.send(
+                sender=cls,
+                instance=obj,
+                created=False,
+                update_fields=frozenset(updated),
+                raw=False,
+                using=db,
+            )
+
+        if not pending:
+            return len(modified), 0
+
+        json_fields = cls._json_fields()
+        now = timezone.now()
+        created = []
+        for fields, lookup in pending.values():
+            obj = cls(**lookup, **fields)
+            # Set by save() otherwise
+            obj.json_digest = obj._digest([getattr(obj, k) for k in json_fields])
+            obj.last_launch = now
+            created.append(obj)
+
+        try:
+            with transaction.atomic(using=db):
+                queryset.bulk_create(created, batch_size=batch_size)
+        except IntegrityError:
+            # Created concurrently. upsert() converges and sends post_save.
+            count = sum(
+                cls.upsert(fields, **lookup)[1] for fields, lookup in pending.values()
+            )
+            return len(modified), count
+
+        for obj in created:
+            post_save.send(
+                sender=cls,
+                instance=obj,
+                created=True,
+                update_fields=None,
+                raw=False,
+                using=db,
+            )
+
+        return len(modified), len(created)
+
+    @classmethod
+    def _lookup_key(cls, lookup):
+        # Values of a lookup in the order of its sorted field names, related
+        # objects by key
+        return tuple(
+            value.pk if isinstance(value, models.Model) else value
+            for _, value in sorted(lookup.items())
+        )
 
 
 class Key(models.Model):
     # Key in RFC 7517 representation
     _jwk = models.JSONField(db_column="jwk")
+    # Key ID of _jwk, stored to avoid parsing the key
+    _kid = models.CharField(
+        "KID", db_column="kid", max_length=255, editable=False, default=""
+    )
 
     def __str__(self):
         return f"KID: {self.kid}"
 
     @property
     def jwk(self):
-        return jwk.JWK().from_json(self._jwk)
+        from jwcrypto import jwk
+
+        return jwk.JWK(**loads(self._jwk))
 
     @jwk.setter
     def jwk(self, pem):
+        from jwcrypto import jwk
+
         if not pem:
             key = jwk.JWK().generate(kty="RSA")
             key.kid = key.thumbprint()
         else:
             key = jwk.JWK().from_pem(bytes(pem, "ascii"))
 
-        self._jwk = key.export()
+        self._jwk = dumps(key.export(as_dict=True)).decode("utf-8")
+        self._kid = key.kid or ""
 
     @property
     def kid(self):
-        return self.jwk.kid
+        return self._kid or self.jwk.kid
 
     def pem(self, private=False):
         pem = self.jwk.export_to_pem(private_key=private, password=None)
         return pem.decode("ascii")
 
 
+def platform_cache_key(pk):
+    return f"lti_platform_{pk}"
+
+
+def platform_lookup_key(issuer, deployment_id):
+    digest = sha1(bytes(f"{issuer}#{deployment_id}", "utf-8")).hexdigest()
+    return f"lti_platform_lookup_{digest}"
+
+
+class PlatformManager(models.Manager):
+    def get_cached(self, pk=None, issuer=None, deployment_id=None):
+        """Gets a platform by primary key or by issuer and deployment ID.
+
+        Platforms are cached until they are saved or deleted. Their key is
+        not cached, it is loaded on access.
+
+        :raises Platform.DoesNotExist: if no platform matches
+        """
+        if pk is None:
+            lookup = {"issuer": issuer, "deployment_id": deployment_id}
+            pk = cache.get(platform_lookup_key(issuer, deployment_id))
+        else:
+            lookup = {"pk": pk}
+
+        if pk is not None:
+            platform = cache.get(platform_cache_key(pk))
+
+            # Issuer or deployment ID may have changed since the lookup
+            # entry was written.
+            if platform and all(getattr(platform, k) == v for k, v in lookup.items()):
+                return platform
+
+        platform = self.get(**lookup)
+
+        cache.set_many(
+            {
+                platform_cache_key(platform.pk): platform,
+                platform_lookup_key(
+                    platform.issuer, platform.deployment_id
+                ): platform.pk,
+            }
+        )
+
+        return platform
+
+
 class Platform(Updatable):
     issuer = models.CharField(max_length=255)
     deployment_id = models.CharField("Deployment ID", max_length=255)
@@ -71,6 +372,8 @@ class Platform(Updatable):
     platform_claim = models.JSONField(editable=False, default=dict)
     key = models.ForeignKey(Key, on_delete=models.CASCADE)
 
+    objects = PlatformManager()
+
     class Meta:
         constraints = [
             models.UniqueConstraint(
@@ -82,18 +385,49 @@ class Platform(Updatable):
         self.client = HTTPClient()
         super().__init__(*args, **kwargs)
 
+    def __getstate__(self):
+        # Do not pickle the HTTP session, e.g. when caching. Neither pickle
+        # the private key, if loaded, into a shared cache.
+        state = super().__getstate__()
+        del state["client"]
+        state["_state"].fields_cache.pop("key", None)
+        return state
+
+    def __setstate__(self, state):
+        super().__setstate__(state)
+        self.client = HTTPClient()
+
     def __str__(self):
         return f"{self.issuer} (Deployment ID: {self.deployment_id})"
 
     @property
     def keyset(self):
+        from jwcrypto import jwk
+
         try:
-            resp = self.client.get(self.pub_key_url)
+            resp = self.client.get(self.pub_key_url, kind="keyset", platform=self.pk)
         except LTIRequestError as e:
             raise LTIKeyRetrieveError("Could not retrieve platform keyset.") from e
 
         return jwk.JWKSet.from_json(resp.text)
 
+    def update_claim(self, claims):
+        """Updates the platform claim at most once per interval.
+
+        All launches share the platform row. Claims may differ between
+        platform nodes or versions, so changes are written at most once per
+        `LTI_PLATFORM_CLAIM_INTERVAL` seconds (default: 3600).
+
+        :param claims: claims of a launch
+        """
+        fields = self.get_fields(claims)
+        if not fields or fields["platform_claim"] == self.platform_claim:
+            return
+
+        interval = getattr(settings, "LTI_PLATFORM_CLAIM_INTERVAL", 3600)
+        if cache.add(f"lti_platform_claim_{self.pk}", True, timeout=interval):
+            self.update(fields)
+
     @staticmethod
     def get_fields(claims):
         claim = claims.get("https://purl.imsglobal.org/spec/lti/claim/tool_platform")
@@ -150,7 +484,62 @@ class Context(Updatable):
 
 
 class ResourceLink(models.Model):
-    title = models.CharField(max_length=255, null=True)
+    title = models.CharField(max_length=255, null=True, db_index=True)
+
+    def get_lineitem(self):
+        """Returns grading metadata of this resource.
+
+        Override to have the platform create a lineitem when the resource
+        is placed by deep linking. Keys are arguments of
+        :func:`ags.deeplink_lineitem`.
+
+        :rtype: dictionary or None
+        """
+        return None
+
+
+class GradingIterable(ModelIterable):
+    """Yields resources sharing lineitem managers and clients.
+
+    Resources of a context share a lineitem manager, contexts of a platform
+    share a client.
+    """
+
+    def __iter__(self):
+        managers = {}
+        clients = {}
+
+        for resource in super().__iter__():
+            context = resource.context
+            if context is not None:
+                manager = managers.get(context.pk)
+                if manager is None:
+                    client = clients.setdefault(
+                        context.platform_id, context.platform.client
+                    )
+                    manager = managers[context.pk] = LineItemManager(context, client)
+
+                resource._lineitem_manager = manager
+
+            yield resource
+
+
+class ResourceQuerySet(models.QuerySet):
+    def for_grading(self, context=None):
+        """Returns resources with a lineitem, ready for grading.
+
+        Context, platform and key are loaded along with the resources.
+
+        :param context: optionally, restrict to resources of this context
+        """
+        queryset = self.exclude(lineitem_id=None).select_related(
+            "context__platform__key"
+        )
+        if context is not None:
+            queryset = queryset.filter(context=context)
+
+        queryset._iterable_class = GradingIterable
+        return queryset
 
 
 class Resource(Updatable):
@@ -164,6 +553,8 @@ class Resource(Updatable):
     description = models.CharField(max_length=255, editable=False, null=True)
     lineitem_id = models.CharField(max_length=255, editable=False, null=True)
 
+    objects = ResourceQuerySet.as_manager()
+
     class Meta:
         constraints = [
             models.UniqueConstraint(
@@ -184,8 +575,13 @@ class Resource(Updatable):
                 "for this resource."
             )
 
+        # Set by Resource.objects.for_grading()
+        manager = getattr(self, "_lineitem_manager", None)
+        if manager is None:
+            manager = self.context.lineitems
+
         data = {"id": self.lineitem_id}
-        lineitem = LineItem(self.context.lineitems, data)
+        lineitem = LineItem(manager, data)
 
         return lineitem
 
@@ -217,6 +613,10 @@ class Resource(Updatable):
         }
 
 
+def user_generation_key(user_id):
+    return f"lti_user_generation_{user_id}"
+
+
 class LTIUser(Updatable):
     user = models.OneToOneField(User, on_delete=models.CASCADE, related_name="lti")
     platform = models.ForeignKey(Platform, on_delete=models.CASCADE, null=True)
@@ -256,11 +656,42 @@ class LTIUser(Updatable):
         return obj.roles
 
 
+def roles_cache_key(lti_user_id, context_id):
+    return f"lti_roles_{lti_user_id}_{context_id}"
+
+
+class RolesManager(models.Manager):
+    def get_cached(self, lti_user_id, context_id):
+        """Gets roles of a LTI user within a context.
+
+        Role sets are cached until the roles are saved or deleted.
+
+        :param lti_user_id: primary key of :class:`LTIUser`
+        :param context_id: primary key of :class:`Context`
+        :rtype: :class:`roles.RoleSet`
+        :raises Roles.DoesNotExist: if no roles match
+        """
+        cache_key = roles_cache_key(lti_user_id, context_id)
+        roles = cache.get(cache_key)
+
+        if roles is None:
+            roles = RoleSet(
+                self.values_list("roles", flat=True).get(
+                    lti_user_id=lti_user_id, context_id=context_id
+                )
+            )
+            cache.set(cache_key, roles)
+
+        return roles
+
+
 class Roles(Updatable):
     lti_user = models.ForeignKey(LTIUser, on_delete=models.CASCADE)
     context = models.ForeignKey(Context, on_delete=models.CASCADE, null=True)
     roles = models.JSONField(editable=False, default=list)
 
+    objects = RolesManager()
+
     @staticmethod
     def get_fields(claims):
         return {"roles": claims["https://purl.imsglobal.org/spec/lti/claim/roles"]}
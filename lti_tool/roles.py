@@ -0,0 +1,60 @@
+from enum import IntFlag
+
+MEMBERSHIP = "http://purl.imsglobal.org/vocab/lis/v2/membership#"
+INSTITUTION = "http://purl.imsglobal.org/vocab/lis/v2/institution/person#"
+SYSTEM = "http://purl.imsglobal.org/vocab/lis/v2/system/person#"
+
+
+class RoleFlag(IntFlag):
+    NONE = 0
+    INSTRUCTOR = 1
+    LEARNER = 2
+    ADMIN = 4
+
+
+# Context roles may be given as simple names as well
+ROLE_FLAGS = {
+    f"{MEMBERSHIP}Instructor": RoleFlag.INSTRUCTOR,
+    "Instructor": RoleFlag.INSTRUCTOR,
+    f"{MEMBERSHIP}Learner": RoleFlag.LEARNER,
+    "Learner": RoleFlag.LEARNER,
+    f"{MEMBERSHIP}Administrator": RoleFlag.ADMIN,
+    "Administrator": RoleFlag.ADMIN,
+    f"{INSTITUTION}Administrator": RoleFlag.ADMIN,
+    f"{SYSTEM}Administrator": RoleFlag.ADMIN,
+    f"{SYSTEM}SysAdmin": RoleFlag.ADMIN,
+}
+
+
+class RoleSet(frozenset):
+    """Roles (URIs) of a user within a context.
+
+    Principal roles are additionally normalized to :class:`RoleFlag`.
+    """
+
+    def __new__(cls, roles=()):
+        obj = super().__new__(cls, roles)
+
+        flags = RoleFlag.NONE
+        for role in obj:
+            flags |= ROLE_FLAGS.get(role, RoleFlag.NONE)
+        obj.flags = flags
+
+        return obj
+
+    def __contains__(self, role):
+        if isinstance(role, RoleFlag):
+            return bool(self.flags & role)
+        return super().__contains__(role)
+
+    @property
+    def is_instructor(self):
+        return bool(self.flags & RoleFlag.INSTRUCTOR)
+
+    @property
+    def is_learner(self):
+        return bool(self.flags & RoleFlag.LEARNER)
+
+    @property
+    def is_admin(self):
+        return bool(self.flags & RoleFlag.ADMIN)
@@ -0,0 +1,85 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+
+# Set once a request has written. Later reads of the same request go to the
+# primary database to see their own writes.
+_pinned = ContextVar("lti_pinned", default=False)
+
+
+@contextmanager
+def use_primary():
+    """Routes all reads inside the block to the primary database."""
+    token = _pinned.set(True)
+    try:
+        yield
+    finally:
+        _pinned.reset(token)
+
+
+@contextmanager
+def request_scope():
+    """Resets pinning for a request, see :class:`middleware.LTIMiddleware`."""
+    token = _pinned.set(False)
+    try:
+        yield
+    finally:
+        _pinned.reset(token)
+
+
+class LTIRouter:
+    """Sends reads of LTI models to a replica.
+
+    Routed are models of this app, subclasses of
+    :class:`models.ResourceLink` and the user model. The replica alias is
+    set by `LTI_REPLICA_DATABASE`. Writes go to the primary database
+    (`LTI_PRIMARY_DATABASE`, default: 'default') and pin subsequent reads of
+    the same request to it.
+    """
+
+    def __init__(self):
+        self.replica = getattr(settings, "LTI_REPLICA_DATABASE", None)
+        self.primary = getattr(settings, "LTI_PRIMARY_DATABASE", DEFAULT_DB_ALIAS)
+
+    def _routed(self, model):
+        from django.contrib.auth import get_user_model
+
+        from lti_tool.models import ResourceLink
+
+        return (
+            model._meta.app_label == "lti_tool"
+            or issubclass(model, ResourceLink)
+            or model is get_user_model()
+        )
+
+    def db_for_read(self, model, **hints):
+        if not self.replica or not self._routed(model):
+            return None
+
+        if _pinned.get():
+            return self.primary
+
+        return self.replica
+
+    def db_for_write(self, model, **hints):
+        if not self._routed(model):
+            return None
+
+        _pinned.set(True)
+        return self.primary
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replica and primary hold the same rows
+        dbs = {self.primary, self.replica}
+        if obj1._state.db in dbs and obj2._state.db in dbs:
+            return True
+
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        if db == self.replica:
+            return False
+
+        return None
@@ -0,0 +1,42 @@
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import Signal, receiver
+
+from lti_tool.models import (
+    LTIUser,
+    Platform,
+    Roles,
+    platform_cache_key,
+    roles_cache_key,
+    user_generation_key,
+)
+
+# Sent with arguments 'request' and 'phases', a list of (name, seconds) tuples,
+# if LTI_TIMING or LTI_SERVER_TIMING is enabled.
+phases_timed = Signal()
+
+
+@receiver([post_save, post_delete], sender=Platform)
+def invalidate_platform(sender, instance, **kwargs):
+    # Lookup entries by issuer and deployment ID are validated on read
+    cache.delete(platform_cache_key(instance.pk))
+
+
+@receiver([post_save, post_delete], sender=Roles)
+def invalidate_roles(sender, instance, **kwargs):
+    cache.delete(roles_cache_key(instance.lti_user_id, instance.context_id))
+
+
+@receiver([post_save, post_delete], sender=User)
+def invalidate_user(sender, instance, update_fields=None, **kwargs):
+    # Logins only update last_login, keep cache
+    if update_fields == frozenset(["last_login"]):
+        return
+
+    cache.delete(user_generation_key(instance.pk))
+
+
+@receiver([post_save, post_delete], sender=LTIUser)
+def invalidate_lti_user(sender, instance, **kwargs):
+    cache.delete(user_generation_key(instance.user_id))
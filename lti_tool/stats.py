@@ -0,0 +1,166 @@
+"""Gradebook statistics over AGS results.
+
+Results are loaded into columns of :class:`array.array`. Aggregates are
+computed with NumPy if it is installed, otherwise with the standard library.
+"""
+
+import math
+import statistics
+from array import array
+from functools import lru_cache
+
+
+@lru_cache(maxsize=None)
+def _numpy():
+    # Imported on first use, it is heavy
+    try:
+        import numpy
+    except ImportError:
+        return None
+
+    return numpy
+
+
+class ResultColumns:
+    """Results of one or more lineitems as parallel columns.
+
+    Missing scores are stored as NaN. Missing maximums default to 1, as
+    defined by AGS.
+    """
+
+    __slots__ = ("user_ids", "scores", "maximums")
+
+    def __init__(self):
+        self.user_ids = []
+        self.scores = array("d")
+        self.maximums = array("d")
+
+    @classmethod
+    def from_results(cls, results):
+        """Loads results.
+
+        :param results: list of results in
+            'application/vnd.ims.lis.v2.resultcontainer+json' representation
+        :rtype: :class:`stats.ResultColumns`
+        """
+        columns = cls()
+        columns.extend(results)
+        return columns
+
+    def __len__(self):
+        return len(self.user_ids)
+
+    def __repr__(self):
+        return f"<ResultColumns: {len(self)} results>"
+
+    def extend(self, results):
+        """Appends results.
+
+        :param results: list of results in
+            'application/vnd.ims.lis.v2.resultcontainer+json' representation
+        """
+        nan = math.nan
+        scores = [result.get("resultScore") for result in results]
+        maximums = [result.get("resultMaximum") for result in results]
+
+        self.user_ids.extend(result["userId"] for result in results)
+        self.scores.extend(nan if s is None else s for s in scores)
+        self.maximums.extend(1.0 if m is None else m for m in maximums)
+
+    def merge(self, other):
+        """Appends the results of other columns.
+
+        :param other: :class:`stats.ResultColumns`
+        """
+        self.user_ids.extend(other.user_ids)
+        self.scores.extend(other.scores)
+        self.maximums.extend(other.maximums)
+
+
+def summarize(columns, bins=10):
+    """Computes aggregates of results.
+
+    Scores are normalized by their maximum, so results of lineitems with
+    different maximums can be aggregated. Statistics of graded results are
+    None if there are none.
+
+    :param columns: :class:`stats.ResultColumns`
+    :param bins: number of histogram bins between 0 and 1
+    :rtype: dictionary with count, graded, completion (graded per count),
+        mean, median, stdev (population), min, max and histogram (list of
+        counts, scores above the maximum in the last bin)
+    """
+    if bins < 1:
+        raise ValueError("Argument bins has to be at least 1.")
+
+    np = _numpy()
+    if np is None:
+        return _summarize_python(columns, bins)
+
+    scores = np.frombuffer(columns.scores, dtype=np.float64)
+    maximums = np.frombuffer(columns.maximums, dtype=np.float64)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        fractions = scores / maximums
+    # Drops missing scores and zero maximums
+    fractions = fractions[np.isfinite(fractions)]
+
+    stats = _stats(len(columns), fractions.size)
+    if fractions.size:
+        stats.update(
+            {
+                "mean": float(fractions.mean()),
+                "median": float(np.median(fractions)),
+                "stdev": float(fractions.std()),
+                "min": float(fractions.min()),
+                "max": float(fractions.max()),
+            }
+        )
+
+    indices = np.clip((fractions * bins).astype(np.intp), 0, bins - 1)
+    stats["histogram"] = np.bincount(indices, minlength=bins).tolist()
+
+    return stats
+
+
+def _summarize_python(columns, bins):
+    fractions = [
+        score / maximum
+        for score, maximum in zip(columns.scores, columns.maximums)
+        if maximum and math.isfinite(score)
+    ]
+
+    stats = _stats(len(columns), len(fractions))
+    if fractions:
+        # statistics.pstdev() computes exactly and is much slower
+        mean = math.fsum(fractions) / len(fractions)
+        variance = math.fsum((f - mean) ** 2 for f in fractions) / len(fractions)
+        stats.update(
+            {
+                "mean": mean,
+                "median": statistics.median(fractions),
+                "stdev": math.sqrt(variance),
+                "min": min(fractions),
+                "max": max(fractions),
+            }
+        )
+
+    histogram = [0] * bins
+    for fraction in fractions:
+        histogram[min(max(int(fraction * bins), 0), bins - 1)] += 1
+    stats["histogram"] = histogram
+
+    return stats
+
+
+def _stats(count, graded):
+    return {
+        "count": count,
+        "graded": graded,
+        "completion": graded / count if count else 0.0,
+        "mean": None,
+        "median": None,
+        "stdev": None,
+        "min": None,
+        "max": None,
+    }
@@ -0,0 +1,36 @@
+from contextlib import contextmanager, nullcontext
+from time import perf_counter
+
+_disabled = nullcontext()
+
+
+class PhaseTimer:
+    """Collects durations of named phases of a request."""
+
+    def __init__(self):
+        self.phases = []
+
+    @contextmanager
+    def phase(self, name):
+        start = perf_counter()
+        try:
+            yield
+        finally:
+            self.phases.append((name, perf_counter() - start))
+
+    def server_timing(self):
+        """Returns phases as value of a 'Server-Timing' header."""
+        return ", ".join(f"{name};dur={s * 1000:.1f}" for name, s in self.phases)
+
+
+def phase(request, name):
+    """Times a phase of the request if timing is enabled.
+
+    Timing is enabled by `LTI_TIMING` or `LTI_SERVER_TIMING` settings,
+    see :class:`middleware.LTIMiddleware`.
+    """
+    timer = getattr(request, "lti_timer", None)
+    if timer is None:
+        return _disabled
+
+    return timer.phase(name)
@@ -5,13 +5,15 @@ from lti_tool.views import (
     DeeplinkView,
     KeysView,
     LoginView,
+    MetricsView,
     RedirectView,
 )
 
 urlpatterns = [
-    path("keys/", KeysView.as_view()),
-    path("login/", LoginView.as_view()),
+    path("keys/", KeysView.as_view(), {}, "lti_keys"),
+    path("login/", LoginView.as_view(), {}, "lti_login"),
     path("deeplink/", DeeplinkView.as_view(), {}, "lti_deeplink"),
     path("deeplink_redirect/", DeeplinkRedirectView.as_view(), {}, "deeplink_redirect"),
     path("redirect/", RedirectView.as_view(), {}, "lti_redirect"),
+    path("metrics/", MetricsView.as_view(), {}, "lti_metrics"),
 ]
@@ -1,21 +1,61 @@
+from collections import defaultdict
 from secrets import token_hex
 from urllib.parse import urlencode
 
-from django.apps import apps
-from django.http import HttpResponse
+from django.core.exceptions import ValidationError
+from django.core.paginator import Paginator
+from django.db.models import Q
+from django.http import Http404, HttpResponse
 from django.middleware.csrf import get_token
-from django.shortcuts import get_object_or_404, redirect
+from django.shortcuts import redirect
 from django.urls import reverse
 from django.utils.decorators import method_decorator
 from django.views import View
 from django.views.decorators.csrf import csrf_exempt, ensure_csrf_cookie
 from django.views.generic.base import TemplateView
-from jwcrypto import jwk, jwt
-from jwcrypto.common import JWException, json_decode
 
+from lti_tool import metrics
+from lti_tool.ags import deeplink_lineitem
+from lti_tool.codec import loads
 from lti_tool.exceptions import LTIValidationError
 from lti_tool.jwt import form_jwt
 from lti_tool.models import Key, Platform, ResourceLink
+from lti_tool.timing import phase
+
+
+def get_resource_models():
+    """Returns subclasses of ResourceLink by 'app_label.model_name'."""
+    return {cls._meta.label_lower: cls for cls in ResourceLink.__subclasses__()}
+
+
+def link_accessor(cls):
+    """Returns the name of the reverse relation from ResourceLink to cls."""
+    return cls._meta.get_ancestor_link(ResourceLink).remote_field.get_accessor_name()
+
+
+def update_selection(request, accept_multiple):
+    """Updates the deep linking selection kept across pages and searches.
+
+    Selected resources shown on the submitted page are replaced by the
+    checked ones.
+
+    :rtype: list of selected resource descriptors
+    """
+    shown = set(request.POST.getlist("shown"))
+    checked = request.POST.getlist("resource")
+    selection = [
+        desc
+        for desc in request.session.get("lti-deeplink-selection", [])
+        if desc not in shown
+    ]
+
+    if not accept_multiple:
+        selection = checked[:1] or selection[:1]
+    else:
+        selection.extend(desc for desc in checked if desc not in selection)
+
+    request.session["lti-deeplink-selection"] = selection
+    return selection
 
 
 def get_resource_objects():
@@ -28,6 +68,8 @@ def get_resource_objects():
 
 class KeysView(View):
     def get(self, request, *args, **kwargs):
+        from jwcrypto import jwk
+
         key_set = jwk.JWKSet()
         keys = Key.objects.all()
 
@@ -40,16 +82,29 @@ class KeysView(View):
         )
 
 
+class MetricsView(View):
+    def get(self, request, *args, **kwargs):
+        if not metrics.enabled():
+            raise Http404("Metrics are disabled.")
+
+        return HttpResponse(
+            metrics.registry.render(),
+            headers={"Content-Type": "text/plain; version=0.0.4; charset=utf-8"},
+        )
+
+
 @method_decorator(csrf_exempt, name="dispatch")
 class LoginView(View):
     http_method_names = ["post"]
 
     def post(self, request, *args, **kwargs):
-        platform = get_object_or_404(
-            Platform,
-            issuer=request.POST["iss"],
-            deployment_id=request.POST["lti_deployment_id"],
-        )
+        try:
+            platform = Platform.objects.get_cached(
+                issuer=request.POST["iss"],
+                deployment_id=request.POST["lti_deployment_id"],
+            )
+        except Platform.DoesNotExist as e:
+            raise Http404("No platform matches the given query.") from e
 
         # client_id is optional in login POST
         client_id = request.POST.get("client_id", platform.client_id)
@@ -80,6 +135,9 @@ class RedirectView(View):
     http_method_names = ["post"]
 
     def validate_message(self, request):
+        from jwcrypto import jwt
+        from jwcrypto.common import JWException
+
         try:
             token = request.POST["id_token"]
             nonce = request.session["lti-nonce"]
@@ -87,18 +145,20 @@ class RedirectView(View):
         except (AttributeError, KeyError) as e:
             raise LTIValidationError from e
 
-        platform = Platform.objects.get(pk=platform_pk)
+        platform = Platform.objects.get_cached(pk=platform_pk)
 
         check_claims = {"aud": platform.client_id, "iss": platform.issuer}
 
+        with phase(request, "keyset"):
+            keyset = platform.keyset
+
         try:
-            token_json = jwt.JWT(
-                jwt=token, key=platform.keyset, check_claims=check_claims
-            )
+            with phase(request, "jwt"):
+                token_json = jwt.JWT(jwt=token, key=keyset, check_claims=check_claims)
         except JWException as e:
             raise LTIValidationError from e
 
-        claims = json_decode(token_json.claims)
+        claims = loads(token_json.claims)
 
         if nonce != claims["nonce"]:
             raise LTIValidationError("Nonce is invalid.")
@@ -120,41 +180,113 @@ class RedirectView(View):
     def post(self, request, *args, **kwargs):
         claims = self.validate_message(request)
         request.session["lti-claims"] = claims
+        request.session.pop("lti-deeplink-selection", None)
 
         redirect_uri = claims[
             "https://purl.imsglobal.org/spec/lti/claim/target_link_uri"
         ]
-        self.validate_redirect(request, redirect_uri)
+        with phase(request, "redirect"):
+            self.validate_redirect(request, redirect_uri)
 
         return redirect(redirect_uri)
 
 
 class DeeplinkView(TemplateView):
     template_name = "deeplink.html"
+    paginate_by = 50
 
-    def get(self, request, *args, **kwargs):
-        claims = request.session["lti-claims"]
+    def get_queryset(self, resource_models, search):
+        """Returns resource links of the given models, ordered by title.
 
-        resources = []
-        for obj in get_resource_objects():
-            resources.append(
-                {
-                    "desc": f"{obj._meta.app_label}.{obj._meta.model_name}#{obj.id}",
-                    "obj": obj,
-                }
-            )
+        Resource links are queried from the common parent table. Subclasses
+        are joined to determine the model of each link. Search matches title
+        prefixes, which can use the title index (a ``LIKE 'prefix%'`` query,
+        case-sensitive on PostgreSQL).
+        """
+        if not resource_models:
+            return ResourceLink.objects.none()
 
-        settings = claims[
+        accessors = [link_accessor(cls) for cls in resource_models]
+
+        query = Q()
+        for accessor in accessors:
+            query |= Q(**{f"{accessor}__isnull": False})
+
+        queryset = (
+            ResourceLink.objects.filter(query)
+            .select_related(*accessors)
+            .order_by("title", "pk")
+        )
+
+        if search:
+            queryset = queryset.filter(title__startswith=search)
+
+        return queryset
+
+    def get_settings(self, request):
+        claims = request.session["lti-claims"]
+        return claims[
             "https://purl.imsglobal.org/spec/lti-dl/claim/deep_linking_settings"
         ]
+
+    def post(self, request, *args, **kwargs):
+        # Navigation within the selection form, keep its selection
+        settings = self.get_settings(request)
+        update_selection(request, settings.get("accept_multiple", False))
+
+        goto = request.POST.get("goto", "")
+        if goto == "search":
+            goto = urlencode(
+                {"q": request.POST.get("q", ""), "model": request.POST.get("model", "")}
+            )
+
+        return redirect(f"{reverse('lti_deeplink')}?{goto}")
+
+    def get(self, request, *args, **kwargs):
+        search = request.GET.get("q", "")
+        model = request.GET.get("model", "")
+
+        resource_models = get_resource_models()
+        if model in resource_models:
+            selected = [resource_models[model]]
+        else:
+            model = ""
+            selected = list(resource_models.values())
+
+        paginator = Paginator(self.get_queryset(selected, search), self.paginate_by)
+        page = paginator.get_page(request.GET.get("page"))
+
+        resources = []
+        for link in page:
+            for cls in selected:
+                accessor = link_accessor(cls)
+                if hasattr(link, accessor):
+                    obj = getattr(link, accessor)
+                    resources.append(
+                        {"desc": f"{cls._meta.label_lower}#{obj.id}", "obj": obj}
+                    )
+                    break
+
+        settings = self.get_settings(request)
         redirect_url = settings["deep_link_return_url"]
         data = settings.get("data", None)
+        accept_multiple = settings.get("accept_multiple", False)
 
         return super(DeeplinkView, self).render_to_response(
             {
                 "redirect_url": redirect_url,
                 "data": data,
+                "accept_multiple": accept_multiple,
                 "resources": resources,
+                "selection": request.session.get("lti-deeplink-selection", []),
+                "page": page,
+                "search": search,
+                "model": model,
+                "models": [
+                    {"label": label, "name": cls._meta.verbose_name}
+                    for label, cls in resource_models.items()
+                ],
+                "query": urlencode({"q": search, "model": model}),
             }
         )
 
@@ -164,27 +296,64 @@ class DeeplinkRedirectView(TemplateView):
     template_name = "deeplink_redirect.html"
 
     def post(self, request):
-        platform = Platform.objects.get(pk=request.session["lti-platform"])
+        platform = Platform.objects.get_cached(pk=request.session["lti-platform"])
+
+        claims = request.session["lti-claims"]
+        settings = claims[
+            "https://purl.imsglobal.org/spec/lti-dl/claim/deep_linking_settings"
+        ]
 
-        resource_desc = request.POST["resource"].split("#", maxsplit=1)
-        model_meta, obj_id = resource_desc[0], resource_desc[1]
-        model = apps.get_model(model_meta)
+        # Combine with resources selected on other pages or searches
+        resource_descs = update_selection(
+            request, settings.get("accept_multiple", False)
+        )
 
-        resource = model.objects.get(pk=obj_id)
+        if len(resource_descs) > 1 and not settings.get("accept_multiple", False):
+            raise LTIValidationError("Platform does not accept multiple items.")
+
+        # Group selected resources by model to query each model once
+        resource_models = get_resource_models()
+        selected = []
+        obj_ids = defaultdict(list)
+        for resource_desc in resource_descs:
+            try:
+                model_meta, obj_id = resource_desc.split("#", maxsplit=1)
+                model = resource_models[model_meta]
+                obj_id = model._meta.pk.to_python(obj_id)
+            except (KeyError, ValueError, ValidationError) as e:
+                raise Http404(f"No resource {resource_desc}.") from e
+
+            selected.append((model, obj_id))
+            obj_ids[model].append(obj_id)
+
+        objects = {model: model.objects.in_bulk(ids) for model, ids in obj_ids.items()}
+
+        content_items = []
+        for model, obj_id in selected:
+            try:
+                resource = objects[model][obj_id]
+            except KeyError as e:
+                raise Http404(f"No {model._meta.object_name} {obj_id}.") from e
+
+            content_item = {
+                "type": "ltiResourceLink",
+                "title": resource.title,
+                "url": request.build_absolute_uri(resource.get_absolute_url()),
+            }
 
-        content_item = {
-            "type": "ltiResourceLink",
-            "title": resource.title,
-            "url": request.build_absolute_uri(resource.get_absolute_url()),
-        }
+            # Let the platform create the lineitem on placement
+            lineitem = resource.get_lineitem()
+            if lineitem:
+                lineitem = {"label": resource.title, **lineitem}
+                content_item.update(deeplink_lineitem(**lineitem))
+
+            content_items.append(content_item)
 
         resp_claims = {
             "https://purl.imsglobal.org/spec/lti/claim/message_type": "LtiDeepLinkingResponse",
             "https://purl.imsglobal.org/spec/lti/claim/version": "1.3.0",
             "https://purl.imsglobal.org/spec/lti/claim/deployment_id": platform.deployment_id,
-            "https://purl.imsglobal.org/spec/lti-dl/claim/content_items": [
-                content_item
-            ],
+            "https://purl.imsglobal.org/spec/lti-dl/claim/content_items": content_items,
         }
 
         data = request.POST.get("data", None)
@@ -193,6 +362,8 @@ class DeeplinkRedirectView(TemplateView):
                 {"https://purl.imsglobal.org/spec/lti-dl/claim/data": data}
             )
 
+        request.session.pop("lti-deeplink-selection", None)
+
         return super(DeeplinkRedirectView, self).render_to_response(
             {
                 "redirect_url": request.POST["redirect_url"],
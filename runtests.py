@@ -0,0 +1,17 @@
+#!/usr/bin/env python
+"""Runs the test suite, e.g. ``./runtests.py tests.test_upsert``."""
+
+import os
+import sys
+
+import django
+from django.conf import settings
+from django.test.utils import get_runner
+
+if __name__ == "__main__":
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "tests.settings")
+    django.setup()
+
+    TestRunner = get_runner(settings)
+    failures = TestRunner().run_tests(sys.argv[1:] or ["tests"])
+    sys.exit(bool(failures))
@@ -0,0 +1,6 @@
+from django.contrib import admin
+
+from lti_tool.admin import ResourceLinkAdmin
+from tests.models import Assignment
+
+admin.site.register(Assignment, ResourceLinkAdmin)
@@ -0,0 +1,10 @@
+from django.db import models
+
+from lti_tool.models import ResourceLink
+
+
+class Assignment(ResourceLink):
+    body = models.TextField(default="", blank=True)
+
+    def get_absolute_url(self):
+        return f"/assignments/{self.pk}/"
@@ -0,0 +1,72 @@
+import os
+import tempfile
+
+SECRET_KEY = "tests"
+DEBUG = False
+ALLOWED_HOSTS = ["*"]
+USE_TZ = True
+DEFAULT_AUTO_FIELD = "django.db.models.AutoField"
+
+INSTALLED_APPS = [
+    "django.contrib.auth",
+    "django.contrib.contenttypes",
+    "django.contrib.sessions",
+    "django.contrib.admin",
+    "django.contrib.messages",
+    "lti_tool",
+    "tests",
+]
+
+# SQLite by default, alternatively a server database, e.g.
+# TEST_DB_ENGINE=django.db.backends.postgresql TEST_DB_NAME=lti
+DATABASES = {
+    "default": {
+        "ENGINE": os.environ.get("TEST_DB_ENGINE", "django.db.backends.sqlite3"),
+        "NAME": os.environ.get("TEST_DB_NAME", ":memory:"),
+        "USER": os.environ.get("TEST_DB_USER", ""),
+        "PASSWORD": os.environ.get("TEST_DB_PASSWORD", ""),
+        "HOST": os.environ.get("TEST_DB_HOST", ""),
+        "PORT": os.environ.get("TEST_DB_PORT", ""),
+    }
+}
+if DATABASES["default"]["ENGINE"] == "django.db.backends.sqlite3":
+    # Unlike in memory, a database file serves the concurrent connections of
+    # concurrency tests
+    DATABASES["default"]["TEST"] = {
+        "NAME": os.path.join(
+            tempfile.gettempdir(), f"lti_tool_tests_{os.getpid()}.sqlite3"
+        )
+    }
+    DATABASES["default"]["OPTIONS"] = {"timeout": 30}
+
+# Replica of the router tests, the default database in tests
+DATABASES["replica"] = dict(DATABASES["default"], TEST={"MIRROR": "default"})
+
+MIDDLEWARE = [
+    "django.contrib.sessions.middleware.SessionMiddleware",
+    "lti_tool.middleware.LTIMiddleware",
+    "django.middleware.csrf.CsrfViewMiddleware",
+    "django.contrib.auth.middleware.AuthenticationMiddleware",
+    "django.contrib.messages.middleware.MessageMiddleware",
+]
+
+AUTHENTICATION_BACKENDS = [
+    "lti_tool.auth.LTIBackend",
+    "django.contrib.auth.backends.ModelBackend",
+]
+
+ROOT_URLCONF = "tests.urls"
+
+TEMPLATES = [
+    {
+        "BACKEND": "django.template.backends.django.DjangoTemplates",
+        "APP_DIRS": True,
+        "OPTIONS": {
+            "context_processors": [
+                "django.template.context_processors.request",
+                "django.contrib.auth.context_processors.auth",
+                "django.contrib.messages.context_processors.messages",
+            ]
+        },
+    }
+]
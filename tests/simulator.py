@@ -0,0 +1,302 @@
+"""Stand-in LTI 1.3 platform for tests.
+
+Serves OIDC authentication, a keyset, an access token endpoint and the
+assignment and grade service on a local port. Launch parameters are passed
+as JSON in ``lti_message_hint``. Never expose it to a network.
+"""
+
+import json
+import random
+import re
+import time
+from secrets import token_hex
+from socketserver import ThreadingMixIn
+from threading import Lock, Thread
+from urllib.parse import parse_qsl
+from wsgiref.simple_server import WSGIRequestHandler, WSGIServer, make_server
+
+from django.utils.html import escape
+from jwcrypto import jwk, jwt
+
+LINEITEM_PATH = re.compile(
+    r"^/contexts/([^/]+)/lineitems(?:/(\d+)(/scores|/results)?)?$"
+)
+
+SCOPES = [
+    "https://purl.imsglobal.org/spec/lti-ags/scope/lineitem",
+    "https://purl.imsglobal.org/spec/lti-ags/scope/result.readonly",
+    "https://purl.imsglobal.org/spec/lti-ags/scope/score",
+]
+
+
+class _Server(ThreadingMixIn, WSGIServer):
+    daemon_threads = True
+
+
+class _Handler(WSGIRequestHandler):
+    def log_message(self, *args):
+        pass
+
+
+class PlatformSimulator:
+    """Local platform answering in its own thread.
+
+    :param latency: seconds to wait before answering a request
+    :param failure_rate: probability (0 to 1) of answering with status 500
+    """
+
+    def __init__(
+        self, client_id="simulator", deployment_id="1", latency=0, failure_rate=0
+    ):
+        self.client_id = client_id
+        self.deployment_id = deployment_id
+        self.latency = latency
+        self.failure_rate = failure_rate
+
+        self.key = jwk.JWK.generate(kty="RSA", size=2048)
+        self.key.kid = self.key.thumbprint()
+
+        self.lineitems = {}
+        self.scores = {}
+        self._lock = Lock()
+        self._counter = 0
+        self._server = None
+        self._thread = None
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *args):
+        self.stop()
+
+    @property
+    def url(self):
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    @property
+    def platform_fields(self):
+        """Fields of a :class:`models.Platform` registering this simulator."""
+        return {
+            "issuer": self.url,
+            "deployment_id": self.deployment_id,
+            "client_id": self.client_id,
+            "auth_req_url": f"{self.url}/auth",
+            "pub_key_url": f"{self.url}/jwks",
+            "access_token_url": f"{self.url}/token",
+        }
+
+    def start(self, host="127.0.0.1", port=0):
+        self._server = make_server(
+            host, port, self, server_class=_Server, handler_class=_Handler
+        )
+        self._thread = Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+        self._thread.join()
+
+    def __call__(self, environ, start_response):
+        if self.latency:
+            time.sleep(self.latency)
+
+        if self.failure_rate and random.random() < self.failure_rate:
+            return self._respond(start_response, "500 Internal Server Error")
+
+        method = environ["REQUEST_METHOD"]
+        path = environ["PATH_INFO"]
+
+        if path == "/auth" and method == "GET":
+            params = dict(parse_qsl(environ.get("QUERY_STRING", "")))
+            return self.auth(start_response, params)
+        if path == "/jwks" and method == "GET":
+            body = self.keyset()
+            return self._respond(start_response, body=body)
+        if path == "/token" and method == "POST":
+            return self.token(start_response, dict(parse_qsl(self._read(environ))))
+
+        match = LINEITEM_PATH.match(path)
+        if match:
+            if not environ.get("HTTP_AUTHORIZATION", "").startswith("Bearer "):
+                return self._respond(start_response, "401 Unauthorized")
+
+            context_id, lineitem, action = match.groups()
+            body = self._read(environ)
+            return self.ags(
+                start_response,
+                method,
+                context_id,
+                lineitem,
+                action,
+                json.loads(body) if body else None,
+            )
+
+        return self._respond(start_response, "404 Not Found")
+
+    def _read(self, environ):
+        length = int(environ.get("CONTENT_LENGTH") or 0)
+        return environ["wsgi.input"].read(length).decode("utf-8")
+
+    def _respond(
+        self,
+        start_response,
+        status="200 OK",
+        body=None,
+        content_type="application/json",
+    ):
+        if body is None:
+            start_response(status, [])
+            return [b""]
+
+        if not isinstance(body, str):
+            body = json.dumps(body)
+
+        data = body.encode("utf-8")
+        start_response(
+            status,
+            [("Content-Type", content_type), ("Content-Length", str(len(data)))],
+        )
+        return [data]
+
+    def keyset(self):
+        keyset = jwk.JWKSet()
+        keyset.add(self.key)
+        return keyset.export(private_keys=False)
+
+    def launch_claims(self, params):
+        """Generates claims of a resource link launch.
+
+        :param params: query parameters of the authentication request
+        """
+        hint = json.loads(params.get("lti_message_hint") or "{}")
+        context_id = hint.get("context", "context")
+        resource_id = hint.get("resource", "resource")
+
+        return {
+            "iss": self.url,
+            "aud": params["client_id"],
+            "sub": params["login_hint"],
+            "nonce": params["nonce"],
+            "given_name": "Sim",
+            "family_name": params["login_hint"],
+            "email": f"{params['login_hint']}@simulator.invalid",
+            "https://purl.imsglobal.org/spec/lti/claim/deployment_id": (
+                self.deployment_id
+            ),
+            "https://purl.imsglobal.org/spec/lti/claim/message_type": (
+                "LtiResourceLinkRequest"
+            ),
+            "https://purl.imsglobal.org/spec/lti/claim/version": "1.3.0",
+            "https://purl.imsglobal.org/spec/lti/claim/target_link_uri": hint.get(
+                "target", params["redirect_uri"]
+            ),
+            "https://purl.imsglobal.org/spec/lti/claim/resource_link": {
+                "id": resource_id,
+                "title": f"Resource {resource_id}",
+            },
+            "https://purl.imsglobal.org/spec/lti/claim/context": {
+                "id": context_id,
+                "label": context_id,
+                "title": f"Context {context_id}",
+                "type": [
+                    "http://purl.imsglobal.org/vocab/lis/v2/course#CourseOffering"
+                ],
+            },
+            "https://purl.imsglobal.org/spec/lti/claim/roles": hint.get(
+                "roles",
+                ["http://purl.imsglobal.org/vocab/lis/v2/membership#Learner"],
+            ),
+            "https://purl.imsglobal.org/spec/lti/claim/tool_platform": {
+                "guid": self.client_id,
+                "name": "Platform simulator",
+                "product_family_code": "simulator",
+            },
+            "https://purl.imsglobal.org/spec/lti-ags/claim/endpoint": {
+                "scope": SCOPES,
+                "lineitems": f"{self.url}/contexts/{context_id}/lineitems",
+            },
+        }
+
+    def auth(self, start_response, params):
+        claims = self.launch_claims(params)
+        token = jwt.JWT(
+            header={"alg": "RS256", "typ": "JWT", "kid": self.key.kid},
+            claims=claims,
+            default_claims={"iat": None, "exp": None},
+        )
+        token.make_signed_token(self.key)
+
+        body = (
+            f'<form id="autosubmit" action="{escape(params["redirect_uri"])}" '
+            f'method="post">'
+            f'<input type="hidden" name="id_token" value="{token.serialize()}">'
+            f'<input type="hidden" name="state" value="{escape(params["state"])}">'
+            f"</form>"
+        )
+        return self._respond(start_response, body=body, content_type="text/html")
+
+    def token(self, start_response, data):
+        if not data.get("client_assertion"):
+            return self._respond(start_response, "400 Bad Request")
+
+        body = {
+            "access_token": token_hex(),
+            "token_type": "Bearer",
+            "expires_in": 3600,
+            "scope": data.get("scope", ""),
+        }
+        return self._respond(start_response, body=body)
+
+    def ags(self, start_response, method, context_id, lineitem, action, data):
+        container = f"{self.url}/contexts/{context_id}/lineitems"
+
+        with self._lock:
+            if lineitem is None:
+                if method == "GET":
+                    body = [
+                        item
+                        for item in self.lineitems.values()
+                        if item["id"].startswith(f"{container}/")
+                    ]
+                    return self._respond(start_response, body=body)
+                if method == "POST":
+                    self._counter += 1
+                    item = dict(data, id=f"{container}/{self._counter}")
+                    self.lineitems[item["id"]] = item
+                    self.scores[item["id"]] = {}
+                    return self._respond(start_response, "201 Created", item)
+
+            lineitem_id = f"{container}/{lineitem}"
+            if lineitem_id not in self.lineitems:
+                return self._respond(start_response, "404 Not Found")
+
+            if action == "/scores" and method == "POST":
+                self.scores[lineitem_id][data["userId"]] = data
+                return self._respond(start_response, "204 No Content")
+            if action == "/results" and method == "GET":
+                body = [
+                    {
+                        "id": f"{lineitem_id}/results/{user_id}",
+                        "scoreOf": lineitem_id,
+                        "userId": user_id,
+                        "resultScore": score.get("scoreGiven"),
+                        "resultMaximum": score.get("scoreMaximum"),
+                        "comment": score.get("comment"),
+                    }
+                    for user_id, score in self.scores[lineitem_id].items()
+                ]
+                return self._respond(start_response, body=body)
+            if action is None and method == "GET":
+                return self._respond(start_response, body=self.lineitems[lineitem_id])
+            if action is None and method == "PUT":
+                self.lineitems[lineitem_id] = dict(data, id=lineitem_id)
+                return self._respond(start_response, body=self.lineitems[lineitem_id])
+            if action is None and method == "DELETE":
+                del self.lineitems[lineitem_id]
+                del self.scores[lineitem_id]
+                return self._respond(start_response, "204 No Content")
+
+        return self._respond(start_response, "405 Method Not Allowed")
@@ -0,0 +1,44 @@
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+
+from lti_tool.models import Context, Resource
+from tests.models import Assignment
+from tests.utils import create_platform
+
+
+class ResourceLinkAdminTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser("admin")
+        platform = create_platform()
+        cls.assignment = Assignment.objects.create(title="Assignment")
+
+        for i in range(3):
+            context = Context.objects.create(platform=platform, context_id=f"c{i}")
+            Resource.objects.create(
+                platform=platform,
+                context=context,
+                resource_id=f"r{i}",
+                resource_link=cls.assignment,
+            )
+
+    def setUp(self):
+        self.client.force_login(self.admin)
+
+    def test_changelist_skips_usages(self):
+        with CaptureQueriesContext(connection) as queries:
+            resp = self.client.get("/admin/tests/assignment/")
+
+        self.assertEqual(resp.status_code, 200)
+        for query in queries:
+            self.assertNotIn('"lti_tool_resource"', query["sql"])
+            self.assertNotIn("GROUP BY", query["sql"])
+
+    def test_change_view_counts_usages(self):
+        resp = self.client.get(f"/admin/tests/assignment/{self.assignment.pk}/change/")
+
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(resp.context["adminform"].form.instance, self.assignment)
+        self.assertContains(resp, '<div class="readonly">3</div>', html=True)
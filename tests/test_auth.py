@@ -0,0 +1,124 @@
+from django.contrib.auth import BACKEND_SESSION_KEY, get_user
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+
+from lti_tool.auth import LTIBackend, UserCache, users
+from lti_tool.models import LTIUser, user_generation_key
+from tests.utils import create_platform
+
+BACKEND = "lti_tool.auth.LTIBackend"
+
+
+class GetUserTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        users.clear()
+
+        self.user = User.objects.create_user("user", password="secret")
+        self.lti_user = LTIUser.objects.create(
+            user=self.user, platform=create_platform(), identifier="sub"
+        )
+        self.backend = LTIBackend()
+
+    def test_warm(self):
+        self.backend.get_user(self.user.pk)
+
+        with self.assertNumQueries(0):
+            user = self.backend.get_user(self.user.pk)
+            self.assertEqual(user.lti.identifier, "sub")
+
+    def test_warm_request(self):
+        self.client.force_login(self.user, backend=BACKEND)
+        request = RequestFactory().get("/")
+        request.session = self.client.session
+        request.session.load()
+
+        self.assertEqual(get_user(request), self.user)
+        with self.assertNumQueries(0):
+            user = get_user(request)
+            user.lti
+
+        # The session hash is verified against the cached password
+        self.assertEqual(user.pk, self.user.pk)
+        self.assertEqual(request.session[BACKEND_SESSION_KEY], BACKEND)
+
+    def test_copies(self):
+        user = self.backend.get_user(self.user.pk)
+        user.first_name = "Changed"
+
+        self.assertEqual(self.backend.get_user(self.user.pk).first_name, "")
+
+    def test_password_not_shared(self):
+        self.backend.get_user(self.user.pk)
+
+        for value in cache._cache.values():
+            self.assertNotIn(self.user.password.encode(), value)
+        self.assertIsInstance(cache.get(user_generation_key(self.user.pk)), str)
+
+    def test_invalidated_by_user(self):
+        self.backend.get_user(self.user.pk)
+
+        self.user.first_name = "Changed"
+        self.user.save()
+
+        self.assertEqual(self.backend.get_user(self.user.pk).first_name, "Changed")
+
+    def test_invalidated_by_lti_user(self):
+        self.backend.get_user(self.user.pk)
+
+        self.lti_user.identifier = "changed"
+        self.lti_user.save()
+
+        self.assertEqual(self.backend.get_user(self.user.pk).lti.identifier, "changed")
+
+    def test_invalidated_by_delete(self):
+        self.backend.get_user(self.user.pk)
+        self.user.delete()
+
+        self.assertIsNone(self.backend.get_user(self.user.pk))
+
+    def test_kept_on_login(self):
+        self.backend.get_user(self.user.pk)
+        self.user.save(update_fields=["last_login"])
+
+        with self.assertNumQueries(0):
+            self.backend.get_user(self.user.pk)
+
+    def test_evicted_generation(self):
+        self.backend.get_user(self.user.pk)
+        User.objects.filter(pk=self.user.pk).update(first_name="Changed")
+        cache.clear()
+
+        self.assertEqual(self.backend.get_user(self.user.pk).first_name, "Changed")
+
+    @override_settings(
+        CACHES={"default": {"BACKEND": "django.core.cache.backends.dummy.DummyCache"}}
+    )
+    def test_without_shared_cache(self):
+        self.backend.get_user(self.user.pk)
+
+        with self.assertNumQueries(1):
+            self.backend.get_user(self.user.pk)
+
+
+class UserCacheTest(SimpleTestCase):
+    def test_lru(self):
+        user_cache = UserCache(maxsize=2)
+        for user_id in range(3):
+            user_cache.set(user_id, "g", User(pk=user_id))
+        user_cache.get(1, "g")
+        user_cache.set(3, "g", User(pk=3))
+
+        self.assertIsNone(user_cache.get(0, "g"))
+        self.assertIsNone(user_cache.get(2, "g"))
+        self.assertEqual(user_cache.get(1, "g").pk, 1)
+        self.assertEqual(user_cache.get(3, "g").pk, 3)
+
+    def test_generation(self):
+        user_cache = UserCache()
+        user_cache.set(1, "g", User(pk=1))
+
+        self.assertIsNone(user_cache.get(1, "other"))
+        # Dropped on mismatch
+        self.assertIsNone(user_cache.get(1, "g"))
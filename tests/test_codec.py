@@ -0,0 +1,167 @@
+import json
+import sys
+import time
+from hashlib import sha1
+from unittest import mock, skipUnless
+
+from django.test import SimpleTestCase, TestCase, override_settings
+
+from lti_tool.codec import OrjsonCodec, StdlibCodec, get_codec
+from lti_tool.httpclient import HTTPClient
+from lti_tool.models import Key, Updatable
+from tests.utils import BENCHMARK
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+LINEITEM = "https://platform.test/contexts/1/lineitems/1"
+
+CLAIMS = {
+    "iss": "https://platform.test",
+    "sub": "user",
+    "given_name": "Zoë",
+    "https://purl.imsglobal.org/spec/lti/claim/roles": [
+        "http://purl.imsglobal.org/vocab/lis/v2/membership#Learner"
+    ],
+    "https://purl.imsglobal.org/spec/lti/claim/custom": {"b": 1.5, "a": None},
+}
+
+
+def result_container(n):
+    return [
+        {
+            "id": f"{LINEITEM}/results/user-{i}",
+            "scoreOf": LINEITEM,
+            "userId": f"user-{i}",
+            "resultScore": i % 101,
+            "resultMaximum": 100,
+            "comment": None,
+        }
+        for i in range(n)
+    ]
+
+
+def codecs():
+    available = [StdlibCodec()]
+    if orjson is not None:
+        available.append(OrjsonCodec())
+    return available
+
+
+def legacy_digest(values):
+    # Digest computed before codecs were configurable
+    data = json.dumps(values, sort_keys=True, separators=(",", ":"))
+    return sha1(bytes(data, "utf-8")).hexdigest()
+
+
+def use_codec(path):
+    get_codec.cache_clear()
+    override = override_settings(LTI_JSON_CODEC=path)
+    override.enable()
+
+    def disable():
+        override.disable()
+        get_codec.cache_clear()
+
+    return disable
+
+
+class CodecTest(SimpleTestCase):
+    def test_round_trip(self):
+        container = result_container(10000)
+
+        for codec in codecs():
+            with self.subTest(codec=type(codec).__name__):
+                data = codec.dumps(container)
+                self.assertIsInstance(data, bytes)
+                self.assertEqual(codec.loads(data), container)
+                self.assertEqual(codec.loads(data.decode("utf-8")), container)
+                self.assertEqual(codec.loads(codec.dumps(CLAIMS)), CLAIMS)
+
+    def test_sort_keys(self):
+        for codec in codecs():
+            with self.subTest(codec=type(codec).__name__):
+                data = codec.dumps({"b": 1, "a": {"d": 2, "c": 3}}, sort_keys=True)
+                self.assertEqual(data, b'{"a":{"c":3,"d":2},"b":1}')
+
+    def test_configured(self):
+        self.addCleanup(use_codec("lti_tool.codec.StdlibCodec"))
+        self.assertIsInstance(get_codec(), StdlibCodec)
+
+
+class DigestTest(SimpleTestCase):
+    def test_stdlib_matches_legacy(self):
+        self.addCleanup(use_codec("lti_tool.codec.StdlibCodec"))
+
+        values = [CLAIMS, ["Instructor"], None]
+        self.assertEqual(Updatable._digest(values), legacy_digest(values))
+
+    def test_orjson_matches_legacy_for_ascii(self):
+        if orjson is None:
+            self.skipTest("orjson is not installed")
+        self.addCleanup(use_codec("lti_tool.codec.OrjsonCodec"))
+
+        values = [result_container(3), ["Instructor"], None]
+        self.assertEqual(Updatable._digest(values), legacy_digest(values))
+
+
+class KeyTest(TestCase):
+    def test_jwk_round_trip(self):
+        key = Key()
+        key.jwk = None
+        key.save()
+
+        key = Key.objects.get(pk=key.pk)
+        self.assertTrue(key.jwk.has_private)
+        self.assertEqual(key.jwk.kid, key.kid)
+        self.assertIn("BEGIN PUBLIC KEY", key.pem())
+
+
+class HTTPClientTest(SimpleTestCase):
+    def test_json_encoded_by_codec(self):
+        client = HTTPClient()
+        client._session = mock.Mock()
+
+        client.post(LINEITEM, json=CLAIMS)
+
+        kwargs = client._session.request.call_args.kwargs
+        self.assertNotIn("json", kwargs)
+        self.assertEqual(kwargs["headers"]["Content-Type"], "application/json")
+        self.assertEqual(json.loads(kwargs["data"]), CLAIMS)
+
+
+@skipUnless(BENCHMARK, "LTI_BENCHMARK is not set")
+class CodecBenchmark(SimpleTestCase):
+    """Prints encoding and decoding times of each available codec."""
+
+    results = 50000
+    claim_sets = 1000
+
+    def report(self, line):
+        sys.stderr.write(f"\n{type(self).__name__}: {line}")
+
+    def test_codecs(self):
+        container = result_container(self.results)
+
+        for codec in codecs():
+            start = time.perf_counter()
+            data = codec.dumps(container)
+            encode = time.perf_counter() - start
+
+            start = time.perf_counter()
+            codec.loads(data)
+            decode = time.perf_counter() - start
+
+            start = time.perf_counter()
+            for _ in range(self.claim_sets):
+                codec.loads(codec.dumps(CLAIMS))
+            round_trip = time.perf_counter() - start
+
+            self.report(
+                f"{type(codec).__name__}: {self.results} results "
+                f"({len(data) / 1e6:.1f} MB) encoded in {encode:.3f}s, decoded in "
+                f"{decode:.3f}s; {self.claim_sets} claim sets round-tripped in "
+                f"{round_trip:.3f}s"
+            )
@@ -0,0 +1,153 @@
+from unittest import mock
+
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from tests.models import Assignment
+from tests.utils import create_platform
+
+DEEP_LINKING = "https://purl.imsglobal.org/spec/lti-dl/claim/deep_linking_settings"
+
+
+class DeeplinkTestCase(TestCase):
+    accept_multiple = True
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.platform = create_platform()
+        for title in ["Alpha", "Alphabet", "Beta", "Gamma"]:
+            Assignment.objects.create(title=title)
+
+    def setUp(self):
+        session = self.client.session
+        session["lti-platform"] = self.platform.pk
+        session["lti-claims"] = {
+            DEEP_LINKING: {
+                "deep_link_return_url": "https://platform.test/deeplink",
+                "accept_multiple": self.accept_multiple,
+            }
+        }
+        session.save()
+
+
+class DeeplinkViewTest(DeeplinkTestCase):
+    def titles(self, response):
+        return [r["obj"].title for r in response.context["resources"]]
+
+    def test_list(self):
+        response = self.client.get(reverse("lti_deeplink"))
+
+        self.assertEqual(self.titles(response), ["Alpha", "Alphabet", "Beta", "Gamma"])
+
+    def test_search_by_title_prefix(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse("lti_deeplink"), {"q": "Alph"})
+
+        self.assertEqual(self.titles(response), ["Alpha", "Alphabet"])
+        # A prefix pattern, which can use the title index
+        sql = " ".join(q["sql"] for q in queries)
+        self.assertIn("LIKE 'Alph%'", sql)
+        self.assertNotIn("LIKE '%Alph%'", sql)
+
+
+class DeeplinkSelectionTest(DeeplinkTestCase):
+    def setUp(self):
+        super().setUp()
+        self.descs = {
+            a.title: f"tests.assignment#{a.pk}" for a in Assignment.objects.all()
+        }
+
+    def navigate(self, shown, checked, goto="page=2"):
+        response = self.client.post(
+            reverse("lti_deeplink"),
+            {"shown": shown, "resource": checked, "goto": goto},
+        )
+        self.assertRedirects(
+            response, f"{reverse('lti_deeplink')}?{goto}", fetch_redirect_response=False
+        )
+
+    def submit(self, shown, checked):
+        with mock.patch("lti_tool.views.form_jwt", return_value="jwt") as form_jwt:
+            response = self.client.post(
+                reverse("deeplink_redirect"),
+                {
+                    "shown": shown,
+                    "resource": checked,
+                    "redirect_url": "https://platform.test/deeplink",
+                },
+            )
+
+        if form_jwt.called:
+            claims = form_jwt.call_args.args[1]
+            items = claims["https://purl.imsglobal.org/spec/lti-dl/claim/content_items"]
+            return response, [item["title"] for item in items]
+        return response, None
+
+    def test_selection_across_pages(self):
+        alpha, beta = self.descs["Alpha"], self.descs["Beta"]
+        self.navigate([alpha, self.descs["Alphabet"]], [alpha])
+
+        response = self.client.get(reverse("lti_deeplink"))
+        self.assertEqual(response.context["selection"], [alpha])
+
+        response, titles = self.submit([beta], [beta])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(titles, ["Alpha", "Beta"])
+        self.assertNotIn("lti-deeplink-selection", self.client.session)
+
+    def test_unchecked_on_page_is_dropped(self):
+        alpha = self.descs["Alpha"]
+        self.navigate([alpha], [alpha])
+        self.navigate([alpha], [])
+
+        _, titles = self.submit([self.descs["Gamma"]], [self.descs["Gamma"]])
+        self.assertEqual(titles, ["Gamma"])
+
+    def test_search_keeps_selection(self):
+        alpha = self.descs["Alpha"]
+        response = self.client.post(
+            reverse("lti_deeplink"),
+            {"shown": [alpha], "resource": [alpha], "goto": "search", "q": "Ga"},
+        )
+        self.assertRedirects(
+            response,
+            f"{reverse('lti_deeplink')}?q=Ga&model=",
+            fetch_redirect_response=False,
+        )
+        self.assertEqual(self.client.session["lti-deeplink-selection"], [alpha])
+
+    def test_only_resource_models(self):
+        response, _ = self.submit([], [f"auth.user#{self.platform.pk}"])
+        self.assertEqual(response.status_code, 404)
+
+    def test_invalid_id(self):
+        response, _ = self.submit([], ["tests.assignment#abc"])
+        self.assertEqual(response.status_code, 404)
+
+        response, _ = self.submit([], ["tests.assignment"])
+        self.assertEqual(response.status_code, 404)
+
+
+class DeeplinkSingleSelectionTest(DeeplinkTestCase):
+    accept_multiple = False
+
+    def test_choice_replaces_selection(self):
+        alpha = f"tests.assignment#{Assignment.objects.get(title='Alpha').pk}"
+        beta = f"tests.assignment#{Assignment.objects.get(title='Beta').pk}"
+
+        self.client.post(
+            reverse("lti_deeplink"),
+            {"shown": [alpha], "resource": [alpha], "goto": "page=2"},
+        )
+        with mock.patch("lti_tool.views.form_jwt", return_value="jwt") as form_jwt:
+            self.client.post(
+                reverse("deeplink_redirect"),
+                {"shown": [beta], "resource": [beta], "redirect_url": "x"},
+            )
+
+        items = form_jwt.call_args.args[1][
+            "https://purl.imsglobal.org/spec/lti-dl/claim/content_items"
+        ]
+        self.assertEqual([item["title"] for item in items], ["Beta"])
@@ -0,0 +1,75 @@
+import json
+from io import StringIO
+from threading import Lock, get_ident
+from unittest import mock
+
+from django.core.management import CommandError, call_command
+from django.test import TransactionTestCase
+
+from lti_tool.ags import LineItem, LineItemManager
+from lti_tool.exceptions import LTIRequestError
+from lti_tool.models import Context
+from tests.utils import create_platform
+
+
+class ExportResultsTest(TransactionTestCase):
+    def setUp(self):
+        self.platform = create_platform()
+        for i in range(6):
+            Context.objects.create(
+                platform=self.platform,
+                context_id=f"c{i}",
+                _lineitems=f"https://platform.test/contexts/c{i}/lineitems",
+            )
+
+        self.lock = Lock()
+        self.client_threads = {}
+
+    def list(self, manager):
+        # Record which threads use a client
+        with self.lock:
+            self.client_threads.setdefault(id(manager._client), set()).add(get_ident())
+
+        if manager.context.context_id == "c5":
+            raise LTIRequestError
+
+        return [
+            LineItem(manager, {"id": f"{manager.context._lineitems}/{i}", "label": i})
+            for i in range(2)
+        ]
+
+    def get_results(self, lineitem_id, ttl=None, stale=0):
+        return [{"userId": f"u{i}", "resultScore": i} for i in range(3)]
+
+    def export(self, **options):
+        out = StringIO()
+        with mock.patch.object(
+            LineItemManager, "list", autospec=True, side_effect=self.list
+        ), mock.patch.object(
+            LineItemManager, "get_results", side_effect=self.get_results
+        ):
+            with self.assertRaisesMessage(CommandError, "1 context(s) failed"):
+                call_command(
+                    "lti_export_results", stdout=out, stderr=StringIO(), **options
+                )
+        return out.getvalue()
+
+    def test_jsonl(self):
+        rows = [json.loads(line) for line in self.export(fmt="jsonl").splitlines()]
+
+        # 5 contexts, 2 lineitems, 3 results
+        self.assertEqual(len(rows), 30)
+        self.assertEqual(rows[0]["platform"], self.platform.pk)
+        self.assertEqual({row["context"] for row in rows}, {f"c{i}" for i in range(5)})
+
+    def test_csv(self):
+        lines = self.export(workers=2).splitlines()
+
+        self.assertTrue(lines[0].startswith("platform,context,lineitem"))
+        self.assertEqual(len(lines), 31)
+
+    def test_client_per_thread(self):
+        self.export(workers=3)
+
+        for threads in self.client_threads.values():
+            self.assertEqual(len(threads), 1)
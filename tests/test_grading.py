@@ -0,0 +1,59 @@
+from django.test import TestCase
+
+from lti_tool.models import Context, Resource
+from tests.models import Assignment
+from tests.utils import create_platform
+
+
+class ForGradingTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        platform = create_platform()
+        other = create_platform(deployment_id="2")
+        assignment = Assignment.objects.create(title="Assignment")
+
+        cls.contexts = [
+            Context.objects.create(platform=platform, context_id="c0"),
+            Context.objects.create(platform=platform, context_id="c1"),
+            Context.objects.create(platform=other, context_id="c2"),
+        ]
+        for i, context in enumerate([*cls.contexts, cls.contexts[0]]):
+            Resource.objects.create(
+                resource_link=assignment,
+                resource_id=f"r{i}",
+                platform=context.platform,
+                context=context,
+                lineitem_id=f"https://platform.test/lineitems/{i}",
+            )
+        # Not graded
+        Resource.objects.create(
+            resource_link=assignment,
+            resource_id="ungraded",
+            platform=platform,
+            context=cls.contexts[0],
+        )
+
+    def test_single_query(self):
+        with self.assertNumQueries(1):
+            resources = list(Resource.objects.for_grading().order_by("resource_id"))
+            for resource in resources:
+                resource.lineitem
+                resource.context.platform.key
+
+        self.assertEqual([r.resource_id for r in resources], ["r0", "r1", "r2", "r3"])
+
+    def test_shared_managers_and_clients(self):
+        resources = {r.resource_id: r for r in Resource.objects.for_grading()}
+        managers = {k: r.lineitem._manager for k, r in resources.items()}
+
+        # Same context
+        self.assertIs(managers["r0"], managers["r3"])
+        self.assertIsNot(managers["r0"], managers["r1"])
+        # Same platform
+        self.assertIs(managers["r0"]._client, managers["r1"]._client)
+        self.assertIsNot(managers["r0"]._client, managers["r2"]._client)
+
+    def test_context(self):
+        resources = Resource.objects.for_grading(context=self.contexts[0])
+
+        self.assertEqual(sorted(r.resource_id for r in resources), ["r0", "r3"])
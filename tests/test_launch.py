@@ -0,0 +1,291 @@
+import json
+import os
+import re
+import sys
+import time
+from collections import Counter
+from contextlib import contextmanager
+from unittest import mock, skipUnless
+
+import requests
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import connection
+from django.test import TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+
+from lti_tool.ags import LineItemManager, ScoreBatch
+from lti_tool.exceptions import LTIRequestError
+from lti_tool.models import Context, Key, LTIUser, Platform
+from lti_tool.signals import phases_timed
+from lti_tool.stats import ResultColumns, summarize
+from lti_tool.timing import PhaseTimer
+from tests.models import Assignment
+from tests.simulator import PlatformSimulator
+from tests.utils import BENCHMARK
+
+ID_TOKEN = re.compile(r'name="id_token" value="([^"]+)"')
+STATE = re.compile(r'name="state" value="([^"]*)"')
+
+STATEMENTS = ("SELECT", "INSERT", "UPDATE", "DELETE")
+
+LEARNER = "http://purl.imsglobal.org/vocab/lis/v2/membership#Learner"
+
+# Seconds the simulator waits before answering in benchmarks
+BENCHMARK_LATENCY = float(os.environ.get("LTI_BENCHMARK_LATENCY", 0))
+
+
+class QueryTimer(PhaseTimer):
+    """Counts queries per phase besides timing it.
+
+    Session queries and transaction control statements are not counted.
+    Nested phases count towards their outer phase as well.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.queries = Counter()
+
+    @contextmanager
+    def phase(self, name):
+        with CaptureQueriesContext(connection) as queries:
+            with super().phase(name):
+                yield
+
+        self.queries[name] += sum(
+            1
+            for query in queries
+            if query["sql"].startswith(STATEMENTS)
+            and "django_session" not in query["sql"]
+        )
+
+
+class SimulatorTestCase(TransactionTestCase):
+    latency = 0
+    failure_rate = 0
+
+    def setUp(self):
+        cache.clear()
+
+        self.simulator = PlatformSimulator(
+            latency=self.latency, failure_rate=self.failure_rate
+        )
+        self.simulator.start()
+        self.addCleanup(self.simulator.stop)
+
+        key = Key()
+        key.jwk = None
+        key.save()
+        self.platform = Platform.objects.create(
+            key=key, **self.simulator.platform_fields
+        )
+        self.assignment = Assignment.objects.create(title="Assignment")
+
+    def launch(self, user, context):
+        """Launches the assignment through login, redirect and resource view.
+
+        :rtype: response of the resource view, None if the simulator failed
+        """
+        client = self.client_class()
+        hint = {
+            "target": f"http://testserver{self.assignment.get_absolute_url()}",
+            "context": context,
+            "resource": f"resource-{context}",
+            "roles": [LEARNER],
+        }
+
+        resp = client.post(
+            "/lti/login/",
+            {
+                "iss": self.platform.issuer,
+                "lti_deployment_id": self.platform.deployment_id,
+                "login_hint": user,
+                "lti_message_hint": json.dumps(hint),
+            },
+        )
+        self.assertEqual(resp.status_code, 302)
+
+        auth = requests.get(resp["Location"])
+        if not auth.ok:
+            return None
+
+        resp = client.post(
+            "/lti/redirect/",
+            {
+                "id_token": ID_TOKEN.search(auth.text).group(1),
+                "state": STATE.search(auth.text).group(1),
+            },
+        )
+        if resp.status_code != 302:
+            return None
+
+        return client.get(resp["Location"])
+
+    def create_lineitem(self):
+        self.assertEqual(self.launch("user-0", "context-0").status_code, 200)
+
+        context = Context.objects.get(platform=self.platform)
+        manager = LineItemManager(context, self.platform.client)
+        return manager.create(label="Test", score_maximum=100)
+
+
+class LaunchTest(SimulatorTestCase):
+    def test_launches(self):
+        for i in range(6):
+            with self.subTest(launch=i):
+                resp = self.launch(f"user-{i % 3}", f"context-{i % 2}")
+                self.assertEqual(resp.status_code, 200)
+
+        self.assertEqual(LTIUser.objects.filter(platform=self.platform).count(), 3)
+        self.assertEqual(User.objects.filter(lti__platform=self.platform).count(), 3)
+        self.assertEqual(Context.objects.filter(platform=self.platform).count(), 2)
+
+    def test_scores(self):
+        lineitem = self.create_lineitem()
+
+        n = 200
+        batch = ScoreBatch([f"user-{i}" for i in range(n)], [i % 101 for i in range(n)])
+        lineitem.set_scores(batch)
+
+        results = lineitem.get_results()
+        self.assertEqual(len(results), n)
+
+        stats = summarize(ResultColumns.from_results(results))
+        self.assertEqual(stats["count"], n)
+        self.assertEqual(stats["graded"], n)
+        self.assertAlmostEqual(stats["max"], 1.0)
+
+
+@override_settings(LTI_TIMING=True)
+class LaunchQueriesTest(SimulatorTestCase):
+    """Pins the number of queries per launch phase."""
+
+    def setUp(self):
+        super().setUp()
+
+        self.queries = Counter()
+        phases_timed.connect(self.receive)
+        self.addCleanup(phases_timed.disconnect, self.receive)
+
+        patcher = mock.patch("lti_tool.middleware.PhaseTimer", QueryTimer)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def receive(self, sender, request, **kwargs):
+        self.queries.update(request.lti_timer.queries)
+
+    def launch_queries(self, user, context):
+        self.queries.clear()
+        self.assertEqual(self.launch(user, context).status_code, 200)
+        return dict(self.queries)
+
+    def test_cold_launch(self):
+        self.assertEqual(
+            self.launch_queries("user-0", "context-0"),
+            {
+                "keyset": 0,
+                "jwt": 0,
+                # Resource link of the target
+                "redirect": 1,
+                # Platform claim written, platform cached by the login view
+                "platform": 1,
+                "context": 2,
+                "resource": 3,
+                "user": 4,
+                "roles": 2,
+                # Last login
+                "login": 1,
+            },
+        )
+
+    def test_warm_launch(self):
+        # The first launch writes the platform claim, the second caches again
+        self.launch("user-0", "context-0")
+        self.launch("user-0", "context-0")
+
+        self.assertEqual(
+            self.launch_queries("user-0", "context-0"),
+            {
+                "keyset": 0,
+                "jwt": 0,
+                "redirect": 1,
+                "platform": 0,
+                "context": 1,
+                "resource": 2,
+                "user": 2,
+                "roles": 1,
+                "login": 1,
+            },
+        )
+
+
+class FailureTest(SimulatorTestCase):
+    failure_rate = 1
+
+    def test_failed_authentication(self):
+        self.assertIsNone(self.launch("user-0", "context-0"))
+        self.assertFalse(LTIUser.objects.exists())
+
+    def test_failed_scores(self):
+        context = Context.objects.create(
+            platform=self.platform,
+            context_id="context-0",
+            _lineitems=f"{self.simulator.url}/contexts/context-0/lineitems",
+        )
+        manager = LineItemManager(context, self.platform.client)
+
+        with self.assertRaises(LTIRequestError):
+            manager.create(label="Test", score_maximum=100)
+
+
+@skipUnless(BENCHMARK, "LTI_BENCHMARK is not set")
+class Benchmark(SimulatorTestCase):
+    """Prints throughput of launches and scores."""
+
+    latency = BENCHMARK_LATENCY
+    launches = 50
+    contexts = 5
+    scores = 1000
+
+    def report(self, line):
+        sys.stderr.write(f"\n{type(self).__name__}: {line}")
+
+    def test_launches(self):
+        start = time.perf_counter()
+        with CaptureQueriesContext(connection) as queries:
+            for i in range(self.launches):
+                resp = self.launch(f"user-{i}", f"context-{i % self.contexts}")
+                self.assertEqual(resp.status_code, 200)
+        duration = time.perf_counter() - start
+
+        self.report(
+            f"{self.launches} launches in {duration:.2f}s "
+            f"({self.launches / duration:.1f}/s), "
+            f"{len(queries) / self.launches:.1f} queries/launch"
+        )
+
+    def test_scores(self):
+        lineitem = self.create_lineitem()
+
+        n = self.scores
+        batch = ScoreBatch([f"user-{i}" for i in range(n)], [i % 101 for i in range(n)])
+
+        start = time.perf_counter()
+        with CaptureQueriesContext(connection) as queries:
+            lineitem.set_scores(batch)
+        duration = time.perf_counter() - start
+        self.report(
+            f"{n} scores in {duration:.2f}s ({n / duration:.1f}/s), "
+            f"{len(queries)} queries"
+        )
+
+        start = time.perf_counter()
+        results = lineitem.get_results()
+        self.report(f"{len(results)} results in {time.perf_counter() - start:.3f}s")
+
+        start = time.perf_counter()
+        summarize(ResultColumns.from_results(results))
+        self.report(
+            f"Statistics of {len(results)} results in "
+            f"{time.perf_counter() - start:.3f}s"
+        )
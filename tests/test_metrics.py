@@ -0,0 +1,84 @@
+from django.test import SimpleTestCase, override_settings
+
+from lti_tool import metrics
+from lti_tool.metrics import Registry
+
+LABELS = (("platform", "1"), ("kind", "ags"))
+
+
+class RegistryTest(SimpleTestCase):
+    def setUp(self):
+        self.registry = Registry()
+        self.registry.describe("requests_total", "counter", "Requests.")
+        self.registry.describe("duration_seconds", "histogram", "Duration.")
+
+    def test_render_counter(self):
+        self.registry.inc("requests_total", LABELS)
+        self.registry.inc("requests_total", LABELS, 2)
+        self.registry.inc("other_total", ())
+
+        self.assertEqual(
+            self.registry.render(),
+            "other_total 1\n"
+            "# HELP requests_total Requests.\n"
+            "# TYPE requests_total counter\n"
+            'requests_total{platform="1",kind="ags"} 3\n',
+        )
+
+    def test_render_histogram(self):
+        for value in (0.001, 0.005, 0.3, 20):
+            self.registry.observe("duration_seconds", LABELS, value)
+
+        lines = self.registry.render().splitlines()
+        self.assertEqual(
+            lines[:2],
+            ["# HELP duration_seconds Duration.", "# TYPE duration_seconds histogram"],
+        )
+
+        labels = 'platform="1",kind="ags"'
+        buckets = [line for line in lines if line.startswith("duration_seconds_bucket")]
+        self.assertEqual(len(buckets), len(metrics.BUCKETS) + 1)
+        # Cumulative, bounds are inclusive
+        self.assertEqual(
+            buckets[0], f'duration_seconds_bucket{{{labels},le="0.005"}} 2'
+        )
+        self.assertEqual(buckets[6], f'duration_seconds_bucket{{{labels},le="0.5"}} 3')
+        self.assertEqual(
+            buckets[-1], f'duration_seconds_bucket{{{labels},le="+Inf"}} 4'
+        )
+        self.assertEqual(lines[-2], f"duration_seconds_sum{{{labels}}} 20.306")
+        self.assertEqual(lines[-1], f"duration_seconds_count{{{labels}}} 4")
+
+    def test_clear(self):
+        self.registry.inc("requests_total", LABELS)
+        self.registry.clear()
+
+        self.assertEqual(self.registry.render(), "\n")
+
+
+class MetricsViewTest(SimpleTestCase):
+    def setUp(self):
+        metrics.registry.clear()
+        self.addCleanup(metrics.registry.clear)
+
+    def test_disabled(self):
+        metrics.observe_request(1, "ags", 200, 0.1)
+
+        self.assertEqual(self.client.get("/lti/metrics/").status_code, 404)
+        self.assertNotIn("lti_platform_requests_total{", metrics.registry.render())
+
+    @override_settings(LTI_METRICS=True)
+    def test_enabled(self):
+        metrics.observe_request(1, "ags", 200, 0.1)
+        metrics.observe_token_cache(1, hit=False)
+
+        resp = self.client.get("/lti/metrics/")
+        self.assertEqual(resp.status_code, 200)
+        self.assertTrue(resp["Content-Type"].startswith("text/plain; version=0.0.4"))
+
+        body = resp.content.decode()
+        self.assertIn(
+            'lti_platform_requests_total{platform="1",kind="ags",status="200"} 1',
+            body,
+        )
+        self.assertIn('lti_token_cache_total{platform="1",result="miss"} 1', body)
@@ -0,0 +1,95 @@
+import pickle
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+
+from lti_tool.models import Key, Platform, platform_cache_key
+from tests.utils import create_platform
+
+
+class PlatformCacheTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.platform = create_platform()
+
+    def test_get_cached(self):
+        Platform.objects.get_cached(pk=self.platform.pk)
+
+        with self.assertNumQueries(0):
+            platform = Platform.objects.get_cached(
+                issuer=self.platform.issuer,
+                deployment_id=self.platform.deployment_id,
+            )
+        self.assertEqual(platform.pk, self.platform.pk)
+
+    def test_private_key_not_cached(self):
+        platform = Platform.objects.get_cached(pk=self.platform.pk)
+        platform.key.jwk  # Loaded on access
+
+        cache.set(platform_cache_key(platform.pk), platform)
+        data = pickle.dumps(cache.get(platform_cache_key(platform.pk)))
+        self.assertNotIn(platform.key._jwk.encode("utf-8"), data)
+        self.assertNotIn(b'"d"', data)
+
+        # Pickling a copy leaves the loaded key in place
+        with self.assertNumQueries(0):
+            platform.key
+
+    def test_key_change_visible(self):
+        Platform.objects.get_cached(pk=self.platform.pk)
+
+        key = Key.objects.get(pk=self.platform.key_id)
+        key.jwk = None
+        key.save()
+
+        platform = Platform.objects.get_cached(pk=self.platform.pk)
+        self.assertEqual(platform.key.kid, key.kid)
+
+
+class UpdateClaimTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.platform = create_platform()
+
+    def claims(self, name):
+        return {
+            "https://purl.imsglobal.org/spec/lti/claim/tool_platform": {
+                "guid": "platform",
+                "name": name,
+            }
+        }
+
+    def test_written_once_per_interval(self):
+        with self.assertNumQueries(1):
+            self.platform.update_claim(self.claims("A"))
+        self.assertEqual(self.platform.platform_claim["name"], "A")
+
+        # Unchanged
+        with self.assertNumQueries(0):
+            self.platform.update_claim(self.claims("A"))
+
+        # Changed within the interval, by another node
+        platform = Platform.objects.get(pk=self.platform.pk)
+        with self.assertNumQueries(0):
+            platform.update_claim(self.claims("B"))
+
+        platform.refresh_from_db()
+        self.assertEqual(platform.platform_claim["name"], "A")
+
+    @override_settings(LTI_PLATFORM_CLAIM_INTERVAL=60)
+    def test_written_after_interval(self):
+        with mock.patch("lti_tool.models.cache.add", wraps=cache.add) as add:
+            self.platform.update_claim(self.claims("A"))
+        self.assertEqual(add.call_args.kwargs["timeout"], 60)
+
+        # Expired
+        cache.delete(f"lti_platform_claim_{self.platform.pk}")
+        self.platform.update_claim(self.claims("B"))
+
+        self.platform.refresh_from_db()
+        self.assertEqual(self.platform.platform_claim["name"], "B")
+
+    def test_missing_claim(self):
+        with self.assertNumQueries(0):
+            self.platform.update_claim({})
@@ -0,0 +1,105 @@
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.db.models import QuerySet
+from django.test import TestCase
+from django.utils import timezone
+
+from lti_tool.models import Context, LTIUser, Resource, Roles
+from tests.models import Assignment
+from tests.utils import create_platform
+
+
+class PruneTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        platform = create_platform()
+        assignment = Assignment.objects.create(title="A")
+
+        for i in range(5):
+            context = Context.objects.create(platform=platform, context_id=f"c{i}")
+            lti_user = LTIUser.objects.create(
+                user=User.objects.create(username=f"u{i}"),
+                platform=platform,
+                identifier=f"s{i}",
+            )
+            Roles.objects.create(lti_user=lti_user, context=context)
+            Resource.objects.create(
+                resource_link=assignment,
+                platform=platform,
+                context=context,
+                resource_id=f"r{i}",
+            )
+
+        # Launched long ago: c0, c1, c2 and u0, u1
+        old = timezone.now() - timedelta(days=100)
+        Context.objects.filter(context_id__in=["c0", "c1", "c2"]).update(
+            last_launch=old
+        )
+        LTIUser.objects.filter(identifier__in=["s0", "s1"]).update(last_launch=old)
+        # Never launched, kept
+        User.objects.create(username="admin")
+
+    def prune(self, **options):
+        out = StringIO()
+        call_command("lti_prune", batch_size=2, sleep=0, stdout=out, **options)
+        return out.getvalue()
+
+    def test_dry_run(self):
+        out = self.prune(contexts=30, users=30, dry_run=True)
+
+        self.assertIn("Would delete 3 lti_tool.Context", out)
+        self.assertIn("Would delete 2 auth.User", out)
+        self.assertEqual(Context.objects.count(), 5)
+        self.assertEqual(User.objects.count(), 6)
+
+    def test_contexts_cascade(self):
+        self.prune(contexts=30)
+
+        self.assertEqual(Context.objects.count(), 2)
+        self.assertEqual(Resource.objects.count(), 2)
+        self.assertEqual(Roles.objects.count(), 2)
+
+    def test_contexts_dependents_batched(self):
+        context = Context.objects.get(context_id="c0")
+        for i in range(5):
+            lti_user = LTIUser.objects.create(
+                user=User.objects.create(username=f"x{i}"), identifier=f"x{i}"
+            )
+            Roles.objects.create(lti_user=lti_user, context=context)
+
+        deleted = []
+        delete = QuerySet.delete
+
+        def side_effect(queryset):
+            result = delete(queryset)
+            deleted.append(result[0])
+            return result
+
+        with mock.patch.object(
+            QuerySet, "delete", autospec=True, side_effect=side_effect
+        ):
+            out = self.prune(contexts=30)
+
+        self.assertIn("Deleted 8 lti_tool.Roles", out)
+        self.assertIn("Deleted 3 lti_tool.Context", out)
+        # Each transaction deletes at most a batch of rows
+        self.assertLessEqual(max(deleted), 2)
+
+    def test_users_deleted_with_django_user(self):
+        out = self.prune(users=30)
+
+        self.assertIn("Deleted 2 lti_tool.LTIUser", out)
+        self.assertFalse(User.objects.filter(username__in=["u0", "u1"]).exists())
+        self.assertTrue(User.objects.filter(username="admin").exists())
+        self.assertEqual(LTIUser.objects.count(), 3)
+        self.assertEqual(Roles.objects.count(), 3)
+
+    def test_retention_not_reached(self):
+        self.prune(contexts=365, users=365)
+
+        self.assertEqual(Context.objects.count(), 5)
+        self.assertEqual(User.objects.count(), 6)
@@ -0,0 +1,83 @@
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import SimpleTestCase
+
+from lti_tool.ags import LineItemManager, invalidate_results
+from lti_tool.httpclient import HTTPClient
+
+LINEITEM = "https://platform.test/contexts/1/lineitems/1"
+OLD = [{"userId": "a", "resultScore": 1}]
+NEW = [{"userId": "a", "resultScore": 2}]
+
+
+class ResultsCacheTest(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+        self.manager = LineItemManager(None, HTTPClient())
+
+    def fetch(self, *results):
+        """Patches fetching to return the given results (or call them) in
+        order."""
+        results = list(results)
+
+        def side_effect(lineitem_id):
+            result = results.pop(0)
+            return result(lineitem_id) if callable(result) else result
+
+        return mock.patch.object(
+            LineItemManager, "_fetch_results", side_effect=side_effect
+        )
+
+    def test_cached(self):
+        with self.fetch(OLD) as fetch:
+            self.assertEqual(self.manager.get_results(LINEITEM, ttl=60), OLD)
+            self.assertEqual(self.manager.get_results(LINEITEM, ttl=60), OLD)
+        self.assertEqual(fetch.call_count, 1)
+
+    def test_invalidated(self):
+        with self.fetch(OLD, NEW):
+            self.manager.get_results(LINEITEM, ttl=60)
+            invalidate_results(LINEITEM)
+            self.assertEqual(self.manager.get_results(LINEITEM, ttl=60), NEW)
+
+    def test_fetch_overlapping_score_not_served(self):
+        def fetch_during_score(lineitem_id):
+            # A score is set while the platform answers with old results
+            invalidate_results(lineitem_id)
+            return OLD
+
+        with self.fetch(fetch_during_score, NEW):
+            self.manager.get_results(LINEITEM, ttl=60)
+            self.assertEqual(self.manager.get_results(LINEITEM, ttl=60), NEW)
+
+    def test_refresh_overlapping_score_not_served(self):
+        with self.fetch(OLD):
+            self.manager.get_results(LINEITEM, ttl=60)
+
+        # Refresh of an expired entry started before the score is set
+        with mock.patch("lti_tool.ags.time", return_value=2**40):
+            with mock.patch("lti_tool.ags.Thread") as thread:
+                self.manager.get_results(LINEITEM, ttl=60, stale=60)
+        refresh = thread.call_args.kwargs
+
+        # Refreshed with an own client
+        refresher = refresh["target"].__self__
+        self.assertIsInstance(refresher._client, HTTPClient)
+        self.assertIsNot(refresher._client, self.manager._client)
+
+        invalidate_results(LINEITEM)
+        with self.fetch(OLD):
+            refresh["target"](*refresh["args"])
+
+        with self.fetch(NEW):
+            self.assertEqual(self.manager.get_results(LINEITEM, ttl=60), NEW)
+
+    def test_set_score_invalidates(self):
+        client = mock.Mock()
+        manager = LineItemManager(None, client)
+
+        with self.fetch(OLD, NEW):
+            manager.get_results(LINEITEM, ttl=60)
+            manager.set_scores(LINEITEM, [{"userId": "a", "scoreGiven": 2}])
+            self.assertEqual(manager.get_results(LINEITEM, ttl=60), NEW)
@@ -0,0 +1,78 @@
+from django.contrib.auth.models import User
+from django.contrib.sessions.models import Session
+from django.core.cache import cache
+from django.db import connections, router
+from django.test import TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+
+from lti_tool.auth import LTIBackend
+from lti_tool.models import Context, Platform
+from lti_tool.routers import request_scope, use_primary
+from tests.models import Assignment
+from tests.utils import create_platform
+
+
+@override_settings(
+    DATABASE_ROUTERS=["lti_tool.routers.LTIRouter"], LTI_REPLICA_DATABASE="replica"
+)
+class LTIRouterTest(TransactionTestCase):
+    databases = {"default", "replica"}
+
+    def setUp(self):
+        self.platform = create_platform()
+
+    def queries(self, alias):
+        return CaptureQueriesContext(connections[alias])
+
+    def test_reads_from_replica(self):
+        with request_scope():
+            self.assertEqual(router.db_for_read(Platform), "replica")
+            self.assertEqual(router.db_for_read(Assignment), "replica")
+            self.assertEqual(router.db_for_read(User), "replica")
+            # Not routed
+            self.assertEqual(router.db_for_read(Session), "default")
+
+            with self.queries("replica") as replica, self.queries("default") as default:
+                Platform.objects.get(pk=self.platform.pk)
+
+        self.assertEqual(len(replica), 1)
+        self.assertEqual(len(default), 0)
+
+    def test_pinned_after_write(self):
+        with request_scope():
+            Context.objects.create(platform=self.platform, context_id="c")
+
+            with self.queries("replica") as replica, self.queries("default") as default:
+                Context.objects.get(context_id="c")
+
+        self.assertEqual(len(replica), 0)
+        self.assertEqual(len(default), 1)
+
+        # Next request
+        with request_scope():
+            self.assertEqual(router.db_for_read(Context), "replica")
+
+    def test_use_primary(self):
+        with request_scope():
+            with use_primary():
+                self.assertEqual(router.db_for_read(Platform), "default")
+            self.assertEqual(router.db_for_read(Platform), "replica")
+
+    def test_writes_to_primary(self):
+        with request_scope():
+            self.assertEqual(router.db_for_write(Platform), "default")
+            self.assertEqual(router.db_for_write(Session), "default")
+
+    def test_get_user_from_primary(self):
+        cache.clear()
+        user = User.objects.create(username="user")
+
+        with request_scope():
+            with self.queries("replica") as replica:
+                self.assertEqual(LTIBackend().get_user(user.pk), user)
+
+        self.assertEqual(len(replica), 0)
+
+    def test_no_migrations_on_replica(self):
+        self.assertFalse(router.allow_migrate("replica", "lti_tool"))
+        self.assertTrue(router.allow_migrate("default", "lti_tool"))
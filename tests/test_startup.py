@@ -0,0 +1,40 @@
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+from django.test import SimpleTestCase
+
+ROOT = Path(__file__).resolve().parent.parent
+
+# Run in a fresh interpreter, imports of this process don't count
+STARTUP = """
+import sys
+import django
+django.setup()
+from django.urls import get_resolver
+get_resolver().url_patterns
+print(",".join(m for m in ("requests", "jwcrypto") if m in sys.modules))
+"""
+
+
+class StartupTest(SimpleTestCase):
+    def test_no_heavy_imports(self):
+        env = dict(os.environ, DJANGO_SETTINGS_MODULE="tests.settings")
+        env["PYTHONPATH"] = os.pathsep.join(
+            filter(None, [str(ROOT), env.get("PYTHONPATH")])
+        )
+        result = subprocess.run(
+            [sys.executable, "-c", STARTUP],
+            cwd=ROOT,
+            env=env,
+            capture_output=True,
+            text=True,
+        )
+
+        self.assertEqual(result.returncode, 0, result.stderr)
+        self.assertEqual(
+            result.stdout.strip(),
+            "",
+            "Imported by django.setup() and the URLconf",
+        )
@@ -0,0 +1,100 @@
+import math
+from unittest import mock, skipIf
+
+from django.test import SimpleTestCase
+
+from lti_tool.stats import ResultColumns, _numpy, summarize
+
+
+def results(*pairs):
+    return [
+        {"userId": f"user-{i}", "resultScore": score, "resultMaximum": maximum}
+        for i, (score, maximum) in enumerate(pairs)
+    ]
+
+
+class SummarizeMixin:
+    def summarize(self, columns, bins=10):
+        raise NotImplementedError
+
+    def test_empty(self):
+        stats = self.summarize(ResultColumns())
+
+        self.assertEqual(stats["count"], 0)
+        self.assertEqual(stats["graded"], 0)
+        self.assertEqual(stats["completion"], 0.0)
+        for key in ("mean", "median", "stdev", "min", "max"):
+            self.assertIsNone(stats[key])
+        self.assertEqual(stats["histogram"], [0] * 10)
+
+    def test_summary(self):
+        columns = ResultColumns.from_results(results((1, 4), (2, 4), (3, 4), (10, 10)))
+        stats = self.summarize(columns, bins=4)
+
+        self.assertEqual(stats["count"], 4)
+        self.assertEqual(stats["graded"], 4)
+        self.assertEqual(stats["completion"], 1.0)
+        self.assertAlmostEqual(stats["mean"], 0.625)
+        self.assertAlmostEqual(stats["median"], 0.625)
+        self.assertAlmostEqual(stats["stdev"], math.sqrt(0.078125))
+        self.assertEqual(stats["min"], 0.25)
+        self.assertEqual(stats["max"], 1.0)
+        # Maximum scores in the last bin
+        self.assertEqual(stats["histogram"], [0, 1, 1, 2])
+
+    def test_missing_scores_and_zero_maximums(self):
+        columns = ResultColumns.from_results(
+            results((None, 10), (5, 0), (5, None), (20, 10))
+        )
+        stats = self.summarize(columns, bins=2)
+
+        # Missing maximums default to 1, scores above the maximum are kept
+        self.assertEqual(stats["count"], 4)
+        self.assertEqual(stats["graded"], 2)
+        self.assertEqual(stats["completion"], 0.5)
+        self.assertEqual(stats["min"], 2.0)
+        self.assertEqual(stats["max"], 5.0)
+        self.assertEqual(stats["histogram"], [0, 2])
+
+    def test_nan_scores(self):
+        columns = ResultColumns.from_results(results((math.nan, 1), (0.5, 1)))
+        stats = self.summarize(columns)
+
+        self.assertEqual(stats["graded"], 1)
+        self.assertEqual(stats["mean"], 0.5)
+
+    def test_merge(self):
+        columns = ResultColumns.from_results(results((1, 2)))
+        columns.merge(ResultColumns.from_results(results((None, 2))))
+
+        self.assertEqual(len(columns), 2)
+        self.assertEqual(self.summarize(columns)["completion"], 0.5)
+
+    def test_bins(self):
+        with self.assertRaises(ValueError):
+            self.summarize(ResultColumns(), bins=0)
+
+
+class PythonSummarizeTest(SummarizeMixin, SimpleTestCase):
+    def summarize(self, columns, bins=10):
+        with mock.patch("lti_tool.stats._numpy", return_value=None):
+            return summarize(columns, bins)
+
+
+@skipIf(_numpy() is None, "NumPy is not installed")
+class NumpySummarizeTest(SummarizeMixin, SimpleTestCase):
+    def summarize(self, columns, bins=10):
+        return summarize(columns, bins)
+
+    def test_same_as_python(self):
+        columns = ResultColumns.from_results(
+            results(*[(i % 7 or None, 6) for i in range(100)])
+        )
+
+        with mock.patch("lti_tool.stats._numpy", return_value=None):
+            expected = summarize(columns)
+        stats = summarize(columns)
+
+        self.assertEqual(stats["histogram"], expected["histogram"])
+        for key in ("count", "graded", "completion", "mean", "median", "stdev"):
+            self.assertAlmostEqual(stats[key], expected[key])
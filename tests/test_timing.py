@@ -0,0 +1,46 @@
+from django.conf import settings
+from django.test import TestCase, override_settings
+
+from lti_tool.signals import phases_timed
+from tests.utils import create_platform
+
+
+class SessionTimingTest(TestCase):
+    def setUp(self):
+        self.platform = create_platform()
+        self.phases = []
+        phases_timed.connect(self.receive)
+        self.addCleanup(phases_timed.disconnect, self.receive)
+
+    def receive(self, sender, request, phases, **kwargs):
+        self.phases.extend(name for name, _ in phases)
+
+    def login(self):
+        return self.client.post(
+            "/lti/login/",
+            {
+                "iss": self.platform.issuer,
+                "lti_deployment_id": self.platform.deployment_id,
+                "login_hint": "user",
+                "lti_message_hint": "message",
+            },
+        )
+
+    @override_settings(
+        LTI_SERVER_TIMING=True,
+        MIDDLEWARE=["lti_tool.middleware.LTITimingMiddleware", *settings.MIDDLEWARE],
+    )
+    def test_session_timed(self):
+        response = self.login()
+
+        self.assertEqual(response.status_code, 302)
+        self.assertIn("session;dur=", response["Server-Timing"])
+        self.assertIn("session", self.phases)
+
+    @override_settings(LTI_SERVER_TIMING=True)
+    def test_session_not_timed_without_timing_middleware(self):
+        response = self.login()
+
+        self.assertEqual(response.status_code, 302)
+        self.assertNotIn("session", response.get("Server-Timing", ""))
+        self.assertNotIn("session", self.phases)
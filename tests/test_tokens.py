@@ -0,0 +1,96 @@
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import SimpleTestCase, TestCase
+
+from lti_tool.httpclient import HTTPClient, TokenCache, tokens
+from lti_tool.models import Context
+from tests.utils import create_platform
+
+SCOPE = ["https://purl.imsglobal.org/spec/lti-ags/scope/score"]
+
+
+class TokenCacheTest(SimpleTestCase):
+    def test_expiry(self):
+        token_cache = TokenCache()
+        token_cache.set("key", "token", expires=100)
+
+        with mock.patch("lti_tool.httpclient.time", return_value=99):
+            self.assertEqual(token_cache.get("key"), "token")
+        with mock.patch("lti_tool.httpclient.time", return_value=100):
+            self.assertIsNone(token_cache.get("key"))
+
+        # Dropped
+        self.assertNotIn("key", token_cache._tokens)
+
+    def test_lru(self):
+        token_cache = TokenCache(maxsize=2)
+        expires = 2**40
+        token_cache.set("a", "token-a", expires)
+        token_cache.set("b", "token-b", expires)
+        token_cache.get("a")
+        token_cache.set("c", "token-c", expires)
+
+        self.assertIsNone(token_cache.get("b"))
+        self.assertEqual(token_cache.get("a"), "token-a")
+        self.assertEqual(token_cache.get("c"), "token-c")
+
+
+class AuthHeaderTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        platform = create_platform()
+        cls.contexts = [
+            Context.objects.create(platform=platform, context_id=f"c{i}", scope=SCOPE)
+            for i in range(2)
+        ]
+
+    def setUp(self):
+        cache.clear()
+        tokens.clear()
+        self.addCleanup(tokens.clear)
+
+        self.client = HTTPClient()
+        patcher = mock.patch.object(
+            HTTPClient,
+            "_access_token",
+            return_value={"access_token": "token", "expires_in": 3600},
+        )
+        self.access_token = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_shared_per_platform(self):
+        header = self.client._auth_header(self.contexts[0])
+        self.assertEqual(header, {"Authorization": "Bearer token"})
+
+        with mock.patch("lti_tool.httpclient.cache") as shared:
+            self.client._auth_header(self.contexts[1])
+
+        # Served from the process without a shared cache lookup
+        shared.get.assert_not_called()
+        self.access_token.assert_called_once()
+
+    def test_adopts_shared_entry(self):
+        self.client._auth_header(self.contexts[0])
+        tokens.clear()
+
+        self.client._auth_header(self.contexts[0])
+
+        self.access_token.assert_called_once()
+        self.assertEqual(
+            tokens.get((self.contexts[0].platform_id, tuple(SCOPE))), "token"
+        )
+
+    def test_expired(self):
+        key = (self.contexts[0].platform_id, tuple(SCOPE))
+        with mock.patch("lti_tool.httpclient.time", return_value=1000):
+            self.client._auth_header(self.contexts[0])
+
+        # Expires 5 minutes early to compensate clock skew
+        self.assertEqual(tokens._tokens[key], ("token", 1000 + 3600 - 300))
+
+        with mock.patch("lti_tool.httpclient.time", return_value=1000 + 3300):
+            cache.clear()
+            self.client._auth_header(self.contexts[0])
+
+        self.assertEqual(self.access_token.call_count, 2)
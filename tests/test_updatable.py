@@ -0,0 +1,91 @@
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.db.models import QuerySet
+from django.test import TestCase
+
+from lti_tool.models import Context, LTIUser, Roles
+from tests.utils import create_platform
+
+LEARNER = "http://purl.imsglobal.org/vocab/lis/v2/membership#Learner"
+
+
+class UpdateTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        platform = create_platform()
+        lti_user = LTIUser.objects.create(
+            user=User.objects.create(username="user"),
+            platform=platform,
+            identifier="sub",
+        )
+        cls.roles = Roles.objects.create(lti_user=lti_user, roles=[LEARNER])
+
+    def test_unchanged_skips_save(self):
+        with self.assertNumQueries(0):
+            self.roles.update({"roles": [LEARNER]})
+
+    def test_changed_saves(self):
+        self.roles.update({"roles": ["Instructor"]})
+
+        self.roles.refresh_from_db()
+        self.assertEqual(self.roles.roles, ["Instructor"])
+
+    def test_partial_save_of_json_field_keeps_digest(self):
+        self.roles.roles = ["X"]
+        self.roles.save(update_fields=["roles"])
+
+        roles = Roles.objects.get(pk=self.roles.pk)
+        roles.update({"roles": [LEARNER]})
+
+        roles.refresh_from_db()
+        self.assertEqual(roles.roles, [LEARNER])
+
+    def test_bulk_upsert(self):
+        platform = self.roles.lti_user.platform
+        Context.objects.create(platform=platform, context_id="c0", title="Old")
+        Context.objects.create(platform=platform, context_id="c1", title="Same")
+        items = [
+            (
+                {"title": "New", "scope": ["a"]},
+                {"platform": platform, "context_id": "c0"},
+            ),
+            ({"title": "Same"}, {"platform": platform, "context_id": "c1"}),
+            ({"title": "Created"}, {"platform": platform, "context_id": "c2"}),
+        ]
+
+        # Read, update and insert
+        with self.assertNumQueries(5):
+            self.assertEqual(Context.bulk_upsert(items), (1, 1))
+
+        contexts = {c.context_id: c for c in Context.objects.all()}
+        self.assertEqual(contexts["c0"].title, "New")
+        self.assertEqual(contexts["c2"].title, "Created")
+        self.assertIsNotNone(contexts["c2"].last_launch)
+
+        # Digests of bulk writes match, unchanged objects aren't written
+        with self.assertNumQueries(1):
+            self.assertEqual(Context.bulk_upsert(items), (0, 0))
+
+    def test_bulk_upsert_concurrently_created(self):
+        platform = self.roles.lti_user.platform
+        lookup = {"platform": platform, "context_id": "c0"}
+
+        Context.objects.create(**lookup)
+
+        # Created after the read of existing rows
+        filter = QuerySet.filter
+        reads = []
+
+        def side_effect(queryset, *args, **kwargs):
+            reads.append(args)
+            if len(reads) == 1:
+                return queryset.none()
+            return filter(queryset, *args, **kwargs)
+
+        with mock.patch.object(
+            QuerySet, "filter", autospec=True, side_effect=side_effect
+        ):
+            self.assertEqual(Context.bulk_upsert([({"title": "A"}, lookup)]), (0, 0))
+
+        self.assertEqual(Context.objects.get().title, "A")
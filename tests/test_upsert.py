@@ -0,0 +1,160 @@
+from concurrent.futures import ThreadPoolExecutor
+from threading import Barrier
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.db import IntegrityError, connection
+from django.db.models import QuerySet
+from django.test import TestCase, TransactionTestCase
+
+from lti_tool.auth import LTIBackend
+from lti_tool.models import Context, LTIUser, Resource, Roles, get_or_create
+from tests.models import Assignment
+from tests.utils import create_platform
+from tests.views import AssignmentView
+
+LEARNER = "http://purl.imsglobal.org/vocab/lis/v2/membership#Learner"
+
+
+def miss_first_get():
+    """Patches QuerySet.get to miss once, as if a concurrent transaction
+    inserted the row right after the read."""
+    get = QuerySet.get
+    calls = []
+
+    def side_effect(self, *args, **kwargs):
+        calls.append(self)
+        if len(calls) == 1:
+            raise self.model.DoesNotExist
+        return get(self, *args, **kwargs)
+
+    return mock.patch.object(QuerySet, "get", autospec=True, side_effect=side_effect)
+
+
+class UpsertTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.platform = create_platform()
+
+    def test_create_and_update(self):
+        context, created = Context.upsert(
+            {"title": "A"}, context_id="c", platform=self.platform
+        )
+        self.assertTrue(created)
+
+        context, created = Context.upsert(
+            {"title": "B"}, context_id="c", platform=self.platform
+        )
+        self.assertFalse(created)
+        self.assertEqual(Context.objects.get().title, "B")
+
+    def test_conflict_reads_winning_row(self):
+        winner = Context.objects.create(
+            context_id="c", platform=self.platform, title="A"
+        )
+
+        locking = mock.patch.object(
+            QuerySet,
+            "select_for_update",
+            autospec=True,
+            side_effect=QuerySet.select_for_update,
+        )
+        with miss_first_get() as get, locking as select_for_update:
+            context, created = Context.upsert(
+                {"title": "B"}, context_id="c", platform=self.platform
+            )
+
+        self.assertFalse(created)
+        self.assertEqual(context.pk, winner.pk)
+        # The insert failed, the second read is the locking one
+        self.assertEqual(get.call_count, 2)
+        select_for_update.assert_called_once()
+        self.assertEqual(Context.objects.get().title, "B")
+
+    def test_conflict_on_other_constraint_raises(self):
+        LTIUser.objects.create(
+            user=User.objects.create(username="a"),
+            platform=self.platform,
+            identifier="sub",
+        )
+        other = User.objects.create(username="b")
+
+        with self.assertRaises(IntegrityError):
+            get_or_create(
+                LTIUser,
+                {"user": other},
+                {"platform": self.platform, "identifier": "sub"},
+            )
+
+
+class ConcurrentLaunchTest(TransactionTestCase):
+    """Simultaneous first launches of one user into a new context.
+
+    On SQLite locking reads are plain reads, conflicting inserts are still
+    resolved by reading the row again.
+    """
+
+    threads = 20
+
+    def setUp(self):
+        self.platform = create_platform()
+        self.assignment = Assignment.objects.create(title="Assignment")
+        self.claims = {
+            "iss": self.platform.issuer,
+            "sub": "user",
+            "given_name": "Given",
+            "family_name": "Family",
+            "email": "user@platform.test",
+            "https://purl.imsglobal.org/spec/lti/claim/message_type": (
+                "LtiResourceLinkRequest"
+            ),
+            "https://purl.imsglobal.org/spec/lti/claim/resource_link": {
+                "id": "resource",
+                "title": "Resource",
+            },
+            "https://purl.imsglobal.org/spec/lti/claim/context": {
+                "id": "context",
+                "label": "context",
+                "title": "Context",
+                "type": [
+                    "http://purl.imsglobal.org/vocab/lis/v2/course#CourseOffering"
+                ],
+            },
+            "https://purl.imsglobal.org/spec/lti-ags/claim/endpoint": {
+                "scope": [],
+                "lineitems": "https://platform.test/contexts/context/lineitems",
+            },
+            "https://purl.imsglobal.org/spec/lti/claim/roles": [LEARNER],
+        }
+
+    def launch(self, barrier):
+        view = AssignmentView()
+        view.kwargs = {"pk": self.assignment.pk}
+        barrier.wait()
+
+        try:
+            context = view.get_context(self.claims, self.platform)
+            resource = view.get_resource(self.claims, context, self.platform)
+            user = LTIBackend().authenticate(
+                None, claims=self.claims, context=context, platform=self.platform
+            )
+            return context.pk, resource.pk, user.pk, user.lti.pk
+        finally:
+            connection.close()
+
+    def test_simultaneous_first_launches(self):
+        barrier = Barrier(self.threads, timeout=30)
+
+        with ThreadPoolExecutor(max_workers=self.threads) as executor:
+            futures = [
+                executor.submit(self.launch, barrier) for _ in range(self.threads)
+            ]
+            results = [future.result() for future in futures]
+
+        # All launches converge on the same rows
+        self.assertEqual(len(set(results)), 1)
+        self.assertEqual(Context.objects.count(), 1)
+        self.assertEqual(Resource.objects.count(), 1)
+        self.assertEqual(User.objects.count(), 1)
+        self.assertEqual(LTIUser.objects.count(), 1)
+        self.assertEqual(Roles.objects.get().roles, [LEARNER])
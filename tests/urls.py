@@ -0,0 +1,10 @@
+from django.contrib import admin
+from django.urls import include, path
+
+from tests.views import AssignmentView
+
+urlpatterns = [
+    path("lti/", include("lti_tool.urls")),
+    path("admin/", admin.site.urls),
+    path("assignments/<int:pk>/", AssignmentView.as_view(), name="assignment"),
+]
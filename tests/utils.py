@@ -0,0 +1,23 @@
+import os
+
+from lti_tool.models import Key, Platform
+
+# Benchmarks print timings if set, e.g. LTI_BENCHMARK=1 ./runtests.py
+BENCHMARK = os.environ.get("LTI_BENCHMARK")
+
+
+def create_platform(**fields):
+    key = Key()
+    key.jwk = None
+    key.save()
+
+    values = {
+        "issuer": "https://platform.test",
+        "deployment_id": "1",
+        "client_id": "tool",
+        "auth_req_url": "https://platform.test/auth",
+        "pub_key_url": "https://platform.test/jwks",
+        "access_token_url": "https://platform.test/token",
+    }
+    values.update(fields)
+    return Platform.objects.create(key=key, **values)
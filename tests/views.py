@@ -0,0 +1,12 @@
+from django.http import HttpResponse
+from django.views.generic import DetailView
+
+from lti_tool.mixins import LTIResourceMixin, LTIRoleMixin
+from tests.models import Assignment
+
+
+class AssignmentView(LTIResourceMixin, LTIRoleMixin, DetailView):
+    model = Assignment
+
+    def get(self, request, *args, **kwargs):
+        return HttpResponse("ok")